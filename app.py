@@ -1,56 +1,281 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+from flask import Flask, Blueprint, render_template, request, redirect, url_for, session, jsonify, Response, stream_with_context
 from werkzeug.security import generate_password_hash, check_password_hash
-import requests
 import os
 import json
+import threading
+import click
 from datetime import datetime, date, timedelta
 
 from dotenv import load_dotenv
 
+# Before the local imports: utils.slot_manager (SLOT_INVENTORY) and
+# bot_logic (RESPONSES_RELOAD_SECONDS) read their settings at import time,
+# and gunicorn/uvicorn workers don't load .env on their own.
+load_dotenv()  # Load environment variables from .env file
+
 from flask_mail import Mail
-from utils.mailer import send_email
+from utils.mailer import send_email, outbox_stats
+from utils.flowise_client import FlowiseClient, FlowiseUnavailable, ReplyStreamParser
+from utils.response_cache import ResponseCache
+from utils.intent_classifier import IntentClassifier
+from utils.keyword_matcher import KeywordMatcher
+from utils.conversation_store import ConversationState, create_store
+
+from models import db, User, Appointment, DoctorSchedule, CalendarException
+from utils.database import database_uri, engine_options
+from utils.events import notify_appointment_changed
+from utils.availability_cache import availability_cache
+from utils.slot_manager import SlotManager, SLOT_INVENTORY
+from utils.slot_inventory import materialize_slots
+from utils.dashboard_summary import dashboard_summary
+from utils.live_updates import broker
+from utils.queries import (
+    appointment_page,
+    appointment_to_dict,
+    patient_appointments,
+    DEFAULT_PAGE_SIZE
+)
+from bot_logic import medbot_reply, responses, TREATMENTS
+
+mail = Mail()
 
-from models import db, User, Appointment
-from bot_logic import medbot_reply
+# Every page and API route; registered on the app by create_app()
+bp = Blueprint("main", __name__)
 
 # -----------------------------------------
-# APP CONFIG
+# FLOWISE CONFIG
 # -----------------------------------------
-app = Flask(__name__)
-load_dotenv()  # Load environment variables from .env file
+FLOWISE_URL = os.getenv("FLOWISE_URL", "YOUR_FLOWISE_API_URL")
+FLOWISE_TIMEOUT = float(os.getenv("FLOWISE_TIMEOUT", 12))
+FLOWISE_API_KEY = os.getenv("FLOWISE_API_KEY")
+FLOWISE_MAX_CONCURRENCY = int(os.getenv("FLOWISE_MAX_CONCURRENCY", 8))
+DEBUG_FLOWISE = True
+
+flowise = FlowiseClient(
+    FLOWISE_URL,
+    api_key=FLOWISE_API_KEY,
+    timeout=FLOWISE_TIMEOUT,
+    max_concurrency=FLOWISE_MAX_CONCURRENCY
+)
+
+# Repeated FAQ-style questions are answered from here
+flowise_cache = ResponseCache(
+    max_entries=int(os.getenv("FLOWISE_CACHE_SIZE", 500)),
+    ttl_seconds=int(os.getenv("FLOWISE_CACHE_TTL", 3600))
+)
 
-app.secret_key = os.getenv("FLASK_SECRET_KEY", "default-dev-key")
+# Words that mean "booking" even when the AI says otherwise. Exact matches
+# only: this overrides the AI, and one-edit typos hijack ordinary words
+# ("clearing" -> "cleaning", "scaring" -> "scaling").
+BOOKING_KEYWORDS = [
+    "book", "appointment", "schedule", "visit dentist",
+    "checkup", "cleaning", "tooth pain"
+]
+BOOKING_MATCHER = KeywordMatcher([(BOOKING_KEYWORDS, "booking")], fuzzy=False)
 
+LOCAL_INTENT_THRESHOLD = 0.8
+_intent_classifier = None
 
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///clinic.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-db.init_app(app)
+def get_intent_classifier():
+    """
+    Clear intents are answered locally, without a Flowise round trip.
+    Built on the first chat message (needs clinic_responses.json).
+    """
+    global _intent_classifier
+    if _intent_classifier is None:
+        _intent_classifier = IntentClassifier(TREATMENTS, responses().keys(), BOOKING_KEYWORDS)
+    return _intent_classifier
 
 # -----------------------------------------
-# FLOWISE CONFIG
+# CHAT STATE STORE
 # -----------------------------------------
-FLOWISE_URL = "YOUR_FLOWISE_API_URL"
-FLOWISE_TIMEOUT = 12
-FLOWISE_API_KEY = os.getenv("FLOWISE_API_KEY")
-DEBUG_FLOWISE = True
+# Shared by every worker on the host by default: gunicorn and uvicorn run
+# several processes, and consecutive chat turns may land on different ones.
+# "memory" is only safe with a single worker.
+DEFAULT_CONVERSATION_STORE = "sqlite:///" + os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "chat_state.db"
+)
+_conversation_store = None
+_conversation_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    """
+    Built on the first chat message, so importing the module doesn't open
+    the store's database file.
+    """
+    global _conversation_store
+    if _conversation_store is None:
+        # locked: two first messages must not end up with two memory stores
+        with _conversation_store_lock:
+            if _conversation_store is None:
+                url = os.getenv("CONVERSATION_STORE") or DEFAULT_CONVERSATION_STORE
+                if url == "memory":
+                    print("⚠️ CONVERSATION_STORE=memory keeps chat state in this process; "
+                          "run a single worker or booking steps will be lost")
+                _conversation_store = create_store(
+                    url,
+                    ttl_seconds=int(os.getenv("CONVERSATION_TTL", 1800))
+                )
+    return _conversation_store
+
 
 # -----------------------------------------
-# FLASK-MAIL CONFIG
+# APP FACTORY
 # -----------------------------------------
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = 'clinic_mail id' 
-app.config['MAIL_PASSWORD'] = 'APP_PASSWORD'         
-app.config['MAIL_DEFAULT_SENDER'] = ('MedBot Dental Clinic', 'sender_mailid')
+def create_app(config=None):
+    """
+    Builds a configured app. No database work happens here: run
+    `flask --app app init-db` (or `python app.py`) to create the tables
+    and the default doctor.
+    """
+    app = Flask(__name__)
+
+    app.secret_key = os.getenv("FLASK_SECRET_KEY", "default-dev-key")
+
+    # SQLite by default; any SQLAlchemy URL (postgresql://...) via DATABASE_URI
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri()
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    # -----------------------------------------
+    # FLASK-MAIL CONFIG
+    # -----------------------------------------
+    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
+    app.config['MAIL_PORT'] = 587
+    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_USERNAME'] = 'clinic_mail id' 
+    app.config['MAIL_PASSWORD'] = 'APP_PASSWORD'         
+    app.config['MAIL_DEFAULT_SENDER'] = ('MedBot Dental Clinic', 'sender_mailid')
+    # "thread": send queued emails from a background thread in this process
+    # "off": a separate `python -m utils.mailer` worker sends them
+    app.config['MAIL_OUTBOX_WORKER'] = os.getenv("MAIL_OUTBOX_WORKER", "thread")
+
+    if config:
+        app.config.update(config)
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS",
+        engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
+    )
+
+    db.init_app(app)
+    mail.init_app(app)
+    app.register_blueprint(bp)
+
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create the tables and the default doctor account."""
+        init_db()
+        print("✅ Database initialized")
+
+    @app.cli.command("add-doctor")
+    @click.argument("username")
+    @click.option("--name", help="Display name (new doctors only)")
+    @click.option("--email", help="Email (new doctors only)")
+    @click.option("--password", help="Password (new doctors only)")
+    @click.option("--start", default="09:00", show_default=True)
+    @click.option("--lunch", default="13:00-14:00", show_default=True,
+                  help='"HH:MM-HH:MM", or "none" for no break')
+    @click.option("--end", default="18:00", show_default=True)
+    @click.option("--step", default=15, show_default=True, help="Slot step in minutes")
+    def add_doctor_command(username, name, email, password, start, lunch, end, step):
+        """Create a doctor account, or set an existing doctor's hours."""
+        doctor = User.query.filter_by(username=username, role="doctor").first()
+        if doctor is None:
+            if not (name and email and password):
+                raise click.UsageError("--name, --email and --password are required for a new doctor")
+            doctor = User(
+                name=name,
+                username=username,
+                email=email,
+                password=generate_password_hash(password),
+                role="doctor"
+            )
+            db.session.add(doctor)
+            db.session.flush()
+
+        lunch_start = lunch_end = None
+        if lunch.lower() != "none":
+            lunch_start, lunch_end = lunch.split("-")
+
+        schedule = DoctorSchedule.query.filter_by(doctor_id=doctor.id).first()
+        if schedule is None:
+            schedule = DoctorSchedule(doctor_id=doctor.id)
+            db.session.add(schedule)
+
+        def parse(value):
+            return datetime.strptime(value.strip(), "%H:%M").time()
+
+        schedule.start_time = parse(start)
+        schedule.lunch_start = parse(lunch_start) if lunch_start else None
+        schedule.lunch_end = parse(lunch_end) if lunch_end else None
+        schedule.end_time = parse(end)
+        schedule.step_minutes = step
+        db.session.commit()
+
+        # running workers pick the change up when their doctor list expires
+        availability_cache.invalidate_doctors()
+        print(f"✅ Doctor {doctor.username} (id {doctor.id}): {start}–{end}, lunch {lunch}, {step} min step")
+        if SLOT_INVENTORY:
+            print("ℹ️ Run `flask --app app materialize-slots --rebuild` to apply the new hours to the slot inventory")
+
+    @app.cli.command("close-day")
+    @click.argument("day")
+    @click.option("--hours", help='"HH:MM-HH:MM" to open with special hours instead of closing')
+    @click.option("--reason", help="e.g. Holiday")
+    @click.option("--remove", is_flag=True, help="Drop the exception (back to the weekday hours)")
+    def close_day_command(day, hours, reason, remove):
+        """Mark a date as closed (holiday) or with special opening hours."""
+        day_date = datetime.strptime(day, "%Y-%m-%d").date()
+        exception = CalendarException.query.filter_by(date=day_date).first()
+
+        if remove:
+            if exception is not None:
+                db.session.delete(exception)
+                db.session.commit()
+            availability_cache.invalidate_calendar()
+            print(f"✅ {day_date}: weekday hours")
+            if SLOT_INVENTORY:
+                materialize_slots(SlotManager(inventory=False), day_date, days=1, rebuild=True)
+            return
+
+        if exception is None:
+            exception = CalendarException(date=day_date)
+            db.session.add(exception)
+
+        exception.open_time = exception.close_time = None
+        if hours:
+            open_str, close_str = hours.split("-")
+            exception.open_time = datetime.strptime(open_str.strip(), "%H:%M").time()
+            exception.close_time = datetime.strptime(close_str.strip(), "%H:%M").time()
+        exception.reason = reason
+        db.session.commit()
+
+        # running workers pick the change up when their cached calendar expires
+        availability_cache.invalidate_calendar()
+        print(f"✅ {day_date}: {hours or 'closed'}" + (f" ({reason})" if reason else ""))
+        if SLOT_INVENTORY:
+            materialize_slots(SlotManager(inventory=False), day_date, days=1, rebuild=True)
+
+    @app.cli.command("materialize-slots")
+    @click.option("--weeks", default=4, show_default=True)
+    @click.option("--rebuild", is_flag=True, help="Regenerate existing days (after hours/calendar changes)")
+    def materialize_slots_command(weeks, rebuild):
+        """Generate the slot inventory for the next weeks (run daily)."""
+        created = materialize_slots(SlotManager(inventory=False), days=weeks * 7, rebuild=rebuild)
+        availability_cache.clear()
+        print(f"✅ {created} slots created for the next {weeks} weeks")
+
+    return app
 
-mail = Mail(app)
 
 # -----------------------------------------
 # DB INIT + DEFAULT DOCTOR
 # -----------------------------------------
-with app.app_context():
+def init_db():
+    """
+    Creates missing tables and the default doctor. Needs an app context.
+    """
     db.create_all()
 
     if not User.query.filter_by(role="doctor").first():
@@ -70,7 +295,7 @@ with app.app_context():
 # -----------------------------------------
 # HOME (REAL PAGE)
 # -----------------------------------------
-@app.route("/")
+@bp.route("/")
 def home():
     user = User.query.get(session["user_id"]) if "user_id" in session else None
     return render_template("home.html", user=user)
@@ -78,20 +303,20 @@ def home():
 # -----------------------------------------
 # DASHBOARD ROUTER
 # -----------------------------------------
-@app.route("/dashboard")
+@bp.route("/dashboard")
 def dashboard():
     if "user_id" not in session:
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
     if session.get("role") == "doctor":
-        return redirect(url_for("doctor_dashboard"))
+        return redirect(url_for("main.doctor_dashboard"))
 
-    return redirect(url_for("patient_dashboard"))
+    return redirect(url_for("main.patient_dashboard"))
 
 # -----------------------------------------
 # SIGNUP
 # -----------------------------------------
-@app.route("/signup", methods=["GET", "POST"])
+@bp.route("/signup", methods=["GET", "POST"])
 def signup():
     if request.method == "POST":
         # Check username
@@ -114,14 +339,14 @@ def signup():
         )
         db.session.add(user)
         db.session.commit()
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
     return render_template("signup.html")
 
 # -----------------------------------------
 # LOGIN
 # -----------------------------------------
-@app.route("/login", methods=["GET", "POST"])
+@bp.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "GET":
         return render_template("login.html")
@@ -137,33 +362,28 @@ def login():
         if user.role == "doctor":
             session["doctor_id"] = user.id
 
-        return redirect(url_for("dashboard"))
+        return redirect(url_for("main.dashboard"))
 
     return render_template("login.html", error="Invalid credentials")
 
 # -----------------------------------------
 # LOGOUT
 # -----------------------------------------
-@app.route("/logout")
+@bp.route("/logout")
 def logout():
     session.clear()
-    return redirect(url_for("login"))
+    return redirect(url_for("main.login"))
 
 # -----------------------------------------
 # PATIENT DASHBOARD
 # -----------------------------------------
-@app.route("/patient/dashboard")
+@bp.route("/patient/dashboard")
 def patient_dashboard():
     if "user_id" not in session or session.get("role") != "patient":
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
-    user = User.query.get(session["user_id"])
-    appointments = Appointment.query.filter_by(
-        patient_id=user.id
-    ).order_by(
-        Appointment.appointment_date.desc(),
-        Appointment.appointment_time.desc()
-    ).all()
+    user = db.session.get(User, session["user_id"])
+    appointments = patient_appointments(user.id)
 
     return render_template(
         "patient_dashboard.html",
@@ -174,92 +394,114 @@ def patient_dashboard():
 # -----------------------------------------
 # DOCTOR DASHBOARD
 # -----------------------------------------
-@app.route("/doctor_dashboard")
+@bp.route("/doctor_dashboard")
 def doctor_dashboard():
     if "doctor_id" not in session:
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
     today = date.today()
-    
-    # Today's appointments
-    today_appointments = Appointment.query.filter(
-        Appointment.appointment_date == today
-    ).order_by(Appointment.appointment_time).all()
-    
-    # Upcoming appointments (after today)
-    upcoming_appointments = Appointment.query.filter(
-        Appointment.appointment_date > today
-    ).order_by(
-        Appointment.appointment_date,
-        Appointment.appointment_time
-    ).limit(5).all()
-    
-    # Emergency cases (appointments with status "Emergency")
-    emergencies = Appointment.query.filter_by(
-        status="Emergency"
-    ).order_by(Appointment.id.desc()).all()
-    
-    # Format emergencies to match template expectations
-    # If your Appointment model doesn't have patient_name and created_at fields,
-    # we'll create them on the fly
-    for e in emergencies:
-        if not hasattr(e, 'patient_name'):
-            e.patient_name = e.patient.name if e.patient else "Unknown"
-        if not hasattr(e, 'created_at'):
-            e.created_at = datetime.now()
+
+    # Served from memory; kept current by appointment_changed and
+    # rebuilt from the database on day rollover / every few minutes
+    data = dashboard_summary.get(today)
 
     return render_template(
         "doctor_dashboard.html",
         today=today.strftime('%Y-%m-%d'),
-        appointments=today_appointments,
-        upcoming_appointments=upcoming_appointments,
-        emergencies=emergencies
+        **data
+    )
+
+# -----------------------------------------
+# DOCTOR DASHBOARD LIVE UPDATES (SSE)
+# -----------------------------------------
+@bp.route("/doctor/events")
+def doctor_events():
+    """
+    Server-sent events: one "appointment" event per booking, approval,
+    rejection or emergency, so open dashboards update without reloading.
+    """
+    if "doctor_id" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    last_event_id = request.headers.get("Last-Event-ID")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    subscriber = broker.subscribe(last_event_id)
+    return Response(
+        broker.stream(subscriber),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"   # don't let nginx buffer the stream
+        }
     )
 
 # -----------------------------------------
 # DOCTOR APPOINTMENTS (Full List with Filter)
 # -----------------------------------------
-@app.route("/doctor/appointments")
+def _appointment_page_args():
+    return (
+        request.args.get('filter', 'all'),
+        request.args.get('cursor') or None,
+        request.args.get('per_page', DEFAULT_PAGE_SIZE, type=int)
+    )
+
+
+@bp.route("/doctor/appointments")
 def doctor_appointments():
     if "doctor_id" not in session:
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
-    filter_type = request.args.get('filter', 'all')
-    today = date.today()
-    
-    query = Appointment.query
-    
-    # Apply filters
-    if filter_type == 'today':
-        query = query.filter(Appointment.appointment_date == today)
-    elif filter_type == 'upcoming':
-        query = query.filter(Appointment.appointment_date > today)
-    elif filter_type == 'completed':
-        query = query.filter(Appointment.status == 'completed')
-    elif filter_type == 'cancelled':
-        query = query.filter(
-            (Appointment.status == 'cancelled') | 
-            (Appointment.status == 'rejected')
+    filter_type, cursor, per_page = _appointment_page_args()
+
+    try:
+        appointments, next_cursor = appointment_page(
+            filter_type, date.today(), cursor, per_page
         )
-    
-    appointments = query.order_by(
-        Appointment.appointment_date.desc(),
-        Appointment.appointment_time.desc()
-    ).all()
+    except ValueError:
+        # malformed cursor: start over from the first page
+        return redirect(url_for("main.doctor_appointments", filter=filter_type))
 
     return render_template(
         "doctor_appointments.html",
         appointments=appointments,
-        filter=filter_type
+        filter=filter_type,
+        cursor=cursor,
+        next_cursor=next_cursor
     )
 
+
+@bp.route("/api/doctor/appointments")
+def doctor_appointments_json():
+    if "doctor_id" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 403
+
+    filter_type, cursor, per_page = _appointment_page_args()
+
+    try:
+        appointments, next_cursor = appointment_page(
+            filter_type, date.today(), cursor, per_page
+        )
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid cursor"}), 400
+
+    return jsonify({
+        "success": True,
+        "filter": filter_type,
+        "appointments": [appointment_to_dict(a) for a in appointments],
+        "next_cursor": next_cursor
+    })
+
 # -----------------------------------------
 # ADD EMERGENCY CASE
 # -----------------------------------------
-@app.route("/doctor/add_emergency", methods=["GET", "POST"])
+@bp.route("/doctor/add_emergency", methods=["GET", "POST"])
 def add_emergency():
     if "doctor_id" not in session:
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
     
     if request.method == "POST":
         # Create emergency appointment
@@ -273,15 +515,16 @@ def add_emergency():
         )
         db.session.add(emergency_appointment)
         db.session.commit()
+        notify_appointment_changed(emergency_appointment)
         
-        return redirect(url_for("doctor_dashboard"))
+        return redirect(url_for("main.doctor_dashboard"))
     
     return render_template("add_emergency.html")
 
 # -----------------------------------------
 # CHATBOT (HYBRID MODE)
 # -----------------------------------------
-@app.route("/chatbot", methods=["POST"])
+@bp.route("/chatbot", methods=["POST"])
 def chatbot():
     data = request.get_json(silent=True) or {}
     user_message = data.get("message", "").strip()
@@ -292,74 +535,95 @@ def chatbot():
     if "user_id" not in session:
         return jsonify({"reply": "Please log in to continue 😊"})
 
-    # ------------------------------------------------
-    # BACKEND MODE (booking already in progress)
-    # ------------------------------------------------
-    if session.get("booking_state"):
-        return jsonify(
-            medbot_reply(
-                {"intent": None, "message": user_message},
-                session
-            )
-        )
+    # Booking-flow state lives server side; the cookie only carries its id
+    with ConversationState(get_conversation_store(), session) as state:
+        return jsonify(chatbot_reply(user_message, state))
+
+
+def chatbot_reply(user_message, state):
+    """
+    Routes one chat message (local intent, cache, Flowise, backend) and
+    returns the reply payload. `state` is the ConversationState.
+    """
+    reply, local_intent = local_chat_reply(user_message, state)
+    if reply is not None:
+        return reply
 
     # ------------------------------------------------
     # AI MODE (Flowise – free conversation)
     # ------------------------------------------------
     try:
-        headers = {}
-        if FLOWISE_API_KEY:
-            headers["Authorization"] = f"Bearer {FLOWISE_API_KEY}"
-
-        res = requests.post(
-            FLOWISE_URL,
-            headers=headers,
-            json={"question": user_message},
-            timeout=FLOWISE_TIMEOUT
-        )
-        res.raise_for_status()
-        flowise_data = res.json()
+        payload = flowise.ask(user_message)
 
-    except Exception as e:
-        if DEBUG_FLOWISE:
-            print("❌ Flowise error:", e)
-        return jsonify({"reply": "⚠️ I'm having trouble right now."})
+    except FlowiseUnavailable as e:
+        return flowise_fallback_reply(user_message, state, local_intent, e)
 
+    return flowise_chat_reply(user_message, payload, state)
+
+
+def local_chat_reply(user_message, state):
+    """
+    Answers that need no Flowise call. Returns (payload, local_intent);
+    payload is None when the message should go to Flowise.
+    """
     # ------------------------------------------------
-    # Parse Flowise output
-    # Expected:
-    # {
-    #   reply: "...",
-    #   handoff: "none | booking | availability | status"
-    # }
+    # BACKEND MODE (booking already in progress)
     # ------------------------------------------------
-    try:
-        payload = (
-            flowise_data.get("json")
-            or json.loads(flowise_data.get("text", "{}"))
-        )
-    except Exception:
-        payload = {}
+    if state.get("booking_state"):
+        return medbot_reply(
+            {"intent": None, "message": user_message},
+            state
+        ), None
+
+    # ------------------------------------------------
+    # LOCAL MODE (obvious intents skip Flowise)
+    # ------------------------------------------------
+    local_intent, confidence = get_intent_classifier().classify(user_message)
+    if confidence >= LOCAL_INTENT_THRESHOLD:
+        return medbot_reply(
+            {"intent": local_intent, "message": user_message},
+            state
+        ), local_intent
+
+    cached_reply = flowise_cache.get(user_message)
+    if cached_reply is not None:
+        return {"reply": cached_reply}, local_intent
 
+    return None, local_intent
+
+
+def flowise_fallback_reply(user_message, state, local_intent, error):
+    if DEBUG_FLOWISE:
+        print("❌ Flowise unavailable:", error)
+
+    # Local path: best local guess, no network
+    return medbot_reply(
+        {"intent": local_intent or "general", "message": user_message},
+        state
+    )
+
+
+def flowise_chat_reply(user_message, payload, state):
+    """
+    Final reply for a Flowise payload: the AI reply, or the backend's
+    answer when the payload hands off.
+    """
     reply = payload.get("reply", "🤔 I'm not sure about that.")
     handoff = payload.get("handoff", "none")
 
     # ------------------------------------------------
     # HARD SAFETY NET (AI may miss intent)
     # ------------------------------------------------
-    if handoff == "none":
-        lowered = user_message.lower()
-        if any(k in lowered for k in [
-            "book", "appointment", "schedule", "visit dentist",
-            "checkup", "cleaning", "tooth pain"
-        ]):
-            handoff = "booking"
+    if handoff == "none" and BOOKING_MATCHER.matches(user_message):
+        handoff = "booking"
 
     # ------------------------------------------------
     # NORMAL CHAT
     # ------------------------------------------------
     if handoff == "none":
-        return jsonify({"reply": reply})
+        if "reply" in payload:
+            flowise_cache.set(user_message, reply)
+        return {"reply": reply}
 
     # ------------------------------------------------
     # HANDOFF → BACKEND AUTHORITY
@@ -372,31 +636,113 @@ def chatbot():
 
     intent = handoff_map.get(handoff, handoff)
 
-    return jsonify(
-        medbot_reply(
-            {"intent": intent, "message": user_message},
-            session
-        )
+    return medbot_reply(
+        {"intent": intent, "message": user_message},
+        state
+    )
+
+
+# -----------------------------------------
+# CHATBOT (STREAMING)
+# -----------------------------------------
+def sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
     )
 
-@app.route("/chatbot/greet", methods=["POST"])
+
+@bp.route("/chatbot/stream", methods=["POST"])
+def chatbot_stream():
+    """
+    Same routing as /chatbot, as server-sent events: "token" events carry
+    reply text as Flowise generates it, then one "done" event carries the
+    final reply payload. The final reply replaces the streamed text (it
+    differs when the answer hands off to the backend or Flowise fails
+    midway).
+    """
+    data = request.get_json(silent=True) or {}
+    user_message = data.get("message", "").strip()
+
+    if not user_message:
+        return sse_response(iter([sse_message("done", {"reply": "Please type something 🙂"})]))
+
+    if "user_id" not in session:
+        return sse_response(iter([sse_message("done", {"reply": "Please log in to continue 😊"})]))
+
+    # Created here so the session cookie is set before streaming starts
+    state = ConversationState(get_conversation_store(), session)
+    return sse_response(chatbot_events(user_message, state))
+
+
+def chatbot_events(user_message, state):
+    with state:
+        reply, local_intent = local_chat_reply(user_message, state)
+        if reply is not None:
+            yield sse_message("done", reply)
+            return
+
+        parser = ReplyStreamParser()
+        try:
+            for chunk in flowise.stream(user_message):
+                text = parser.feed(chunk)
+                if text:
+                    yield sse_message("token", {"text": text})
+
+        except FlowiseUnavailable as e:
+            yield sse_message(
+                "done",
+                flowise_fallback_reply(user_message, state, local_intent, e)
+            )
+            return
+
+        yield sse_message(
+            "done",
+            flowise_chat_reply(user_message, parser.payload(), state)
+        )
+
+@bp.route("/api/chatbot/stats", methods=["GET"])
+def chatbot_stats():
+    if "doctor_id" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 403
+
+    return jsonify({
+        "success": True,
+        "cache": flowise_cache.stats(),
+        "flowise_circuit": flowise.breaker.state
+    })
+
+@bp.route("/chatbot/greet", methods=["POST"])
 def chatbot_greet():
+    return jsonify({"reply": greeting_reply(session)})
+
+
+def greeting_reply(session):
+    """
+    Greeting for the first chat opened in a login session, else None.
+    """
     if "user_id" not in session:
-        return jsonify({"reply": None})
+        return None
 
     if session.get("chatbot_greeted"):
-        return jsonify({"reply": None})
+        return None
 
     session["chatbot_greeted"] = True
 
-    return jsonify({
-        "reply": "Heyy! 👋 I'm MedBot 😊\nHow can I help you today?"
-    })
+    return "Heyy! 👋 I'm MedBot 😊\nHow can I help you today?"
 
 # -----------------------------------------
 # APPROVE APPOINTMENT (Updated)
 # -----------------------------------------
-@app.route("/doctor/appointment/<int:appointment_id>/approve", methods=["POST"])
+@bp.route("/doctor/appointment/<int:appointment_id>/approve", methods=["POST"])
 def approve_appointment(appointment_id):
     if "doctor_id" not in session:
         return jsonify({"success": False, "message": "Unauthorized"}), 403
@@ -409,8 +755,10 @@ def approve_appointment(appointment_id):
             "message": f"Appointment is already {appointment.status}"
         })
     
+    old_status = appointment.status
     appointment.status = "approved"
     db.session.commit()
+    notify_appointment_changed(appointment, old_status)
     
     patient = User.query.get(appointment.patient_id)
     
@@ -432,7 +780,7 @@ def approve_appointment(appointment_id):
         
         return jsonify({
             "success": True, 
-            "message": f"Appointment approved! Email sent to {patient.name}"
+            "message": f"Appointment approved! Email queued for {patient.name}"
         })
     except Exception as e:
         print(f"❌ Email error: {e}")
@@ -444,7 +792,7 @@ def approve_appointment(appointment_id):
 # -----------------------------------------
 # REJECT APPOINTMENT (Updated)
 # -----------------------------------------
-@app.route("/doctor/appointment/<int:appointment_id>/reject", methods=["POST"])
+@bp.route("/doctor/appointment/<int:appointment_id>/reject", methods=["POST"])
 def reject_appointment(appointment_id):
     if "doctor_id" not in session:
         return jsonify({"success": False, "message": "Unauthorized"}), 403
@@ -462,8 +810,10 @@ def reject_appointment(appointment_id):
     
     appt_time_display = appointment.appointment_time.strftime('%I:%M %p')
     
+    old_status = appointment.status
     appointment.status = "rejected"
     db.session.commit()
+    notify_appointment_changed(appointment, old_status)
     
     patient = User.query.get(appointment.patient_id)
     
@@ -479,7 +829,7 @@ def reject_appointment(appointment_id):
             reason=rejection_reason
         )
         
-        message = f"Appointment rejected and email sent to {patient.name}. "
+        message = f"Appointment rejected and email queued for {patient.name}. "
         message += f"✅ Time slot {appt_time_display} is now available for other patients."
         
         return jsonify({"success": True, "message": message})
@@ -490,19 +840,31 @@ def reject_appointment(appointment_id):
             "message": f"Appointment rejected but email failed: {str(e)}"
         })
 
+# -----------------------------------------
+# EMAIL OUTBOX STATUS
+# -----------------------------------------
+@bp.route("/api/outbox/status", methods=["GET"])
+def email_outbox_status():
+    if "doctor_id" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 403
+
+    return jsonify({"success": True, "outbox": outbox_stats()})
+
 # -----------------------------------------
 # MANUAL BOOKING (Updated to use email field)
 # -----------------------------------------
-@app.route("/book-appointment", methods=["GET", "POST"])
+@bp.route("/book-appointment", methods=["GET", "POST"])
 def manual_booking():
     if "user_id" not in session or session.get("role") != "patient":
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
     
     user = User.query.get(session["user_id"])
     
+    doctors = User.query.filter_by(role="doctor").order_by(User.id).all()
+
     if request.method == "GET":
         min_date = date.today().strftime('%Y-%m-%d')
-        return render_template("manual_booking.html", user=user, min_date=min_date)
+        return render_template("manual_booking.html", user=user, doctors=doctors, min_date=min_date)
     
     # POST - Process booking
     try:
@@ -512,6 +874,7 @@ def manual_booking():
             return render_template(
                 "manual_booking.html",
                 user=user,
+                doctors=doctors,
                 min_date=date.today().strftime('%Y-%m-%d'),
                 error="Invalid secret key. Please try again."
             )
@@ -523,27 +886,20 @@ def manual_booking():
             return render_template(
                 "manual_booking.html",
                 user=user,
+                doctors=doctors,
                 min_date=date.today().strftime('%Y-%m-%d'),
                 error="Cannot book appointments in the past."
             )
         
-        from utils.validators import validate_appointment_conflict
-        ok, conflict_msg = validate_appointment_conflict(user.id, 1, appointment_date, appointment_time)
-        
-        if not ok:
-            return render_template(
-                "manual_booking.html",
-                user=user,
-                min_date=date.today().strftime('%Y-%m-%d'),
-                error=conflict_msg or "This time slot is no longer available."
-            )
-        
         procedure = request.form.get("procedure")
         duration = int(request.form.get("duration_minutes", 30))
+        # empty = any doctor free at that time
+        doctor_id = request.form.get("doctor_id", type=int)
         
-        new_appointment = Appointment(
+        from utils.booking import book_appointment
+        new_appointment, conflict_msg = book_appointment(
             patient_id=user.id,
-            doctor_id=1,
+            doctor_id=doctor_id,
             appointment_date=appointment_date,
             appointment_time=appointment_time,
             duration_minutes=duration,
@@ -553,8 +909,14 @@ def manual_booking():
             source="manual"
         )
         
-        db.session.add(new_appointment)
-        db.session.commit()
+        if not new_appointment:
+            return render_template(
+                "manual_booking.html",
+                user=user,
+                doctors=doctors,
+                min_date=date.today().strftime('%Y-%m-%d'),
+                error=conflict_msg or "This time slot is no longer available."
+            )
         
         # Send email using the new email field
         try:
@@ -573,6 +935,7 @@ def manual_booking():
         return render_template(
             "manual_booking.html",
             user=user,
+            doctors=doctors,
             min_date=date.today().strftime('%Y-%m-%d'),
             success=f"✅ Appointment booked successfully! Your appointment is on {appointment_date.strftime('%B %d, %Y')} at {appointment_time.strftime('%I:%M %p')}. Please wait for doctor's approval."
         )
@@ -582,19 +945,21 @@ def manual_booking():
         return render_template(
             "manual_booking.html",
             user=user,
+            doctors=doctors,
             min_date=date.today().strftime('%Y-%m-%d'),
             error=f"An error occurred: {str(e)}"
         )
 # -----------------------------------------
 # API: AVAILABLE SLOTS
 # -----------------------------------------
-@app.route("/api/available-slots", methods=["GET"])
+@bp.route("/api/available-slots", methods=["GET"])
 def get_available_slots():
     if "user_id" not in session:
         return jsonify({"success": False, "message": "Not logged in"}), 401
     
     date_str = request.args.get("date")
     duration = request.args.get("duration", type=int)
+    doctor_id = request.args.get("doctor_id", type=int)
     
     if not date_str or not duration:
         return jsonify({"success": False, "message": "Date and duration are required"}), 400
@@ -602,7 +967,7 @@ def get_available_slots():
     try:
         from utils.slot_manager import SlotManager
         slot_manager = SlotManager()
-        available_slots = slot_manager.get_available_start_times(date_str, duration)
+        available_slots = slot_manager.get_available_start_times(date_str, duration, doctor_id)
         
         return jsonify({
             "success": True,
@@ -614,9 +979,117 @@ def get_available_slots():
         print(f"❌ Error fetching slots: {e}")
         return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
 
+# -----------------------------------------
+# API: AVAILABLE SLOTS (DATE RANGE)
+# -----------------------------------------
+MAX_RANGE_DAYS = 31
+
+@bp.route("/api/available-slots/range", methods=["GET"])
+def get_available_slots_range():
+    if "user_id" not in session:
+        return jsonify({"success": False, "message": "Not logged in"}), 401
+
+    start_str = request.args.get("start")
+    days = request.args.get("days", 7, type=int)
+    durations_arg = request.args.get("durations")
+    doctor_id = request.args.get("doctor_id", type=int)
+
+    if not start_str:
+        return jsonify({"success": False, "message": "Start date is required"}), 400
+
+    if not 1 <= days <= MAX_RANGE_DAYS:
+        return jsonify({
+            "success": False,
+            "message": f"Days must be between 1 and {MAX_RANGE_DAYS}"
+        }), 400
+
+    try:
+        datetime.strptime(start_str, "%Y-%m-%d")
+    except ValueError:
+        return jsonify({"success": False, "message": "Start must be a date (YYYY-MM-DD)"}), 400
+
+    try:
+        if durations_arg:
+            durations = [int(d) for d in durations_arg.split(",") if d.strip()]
+        else:
+            # every procedure length the clinic offers
+            durations = [mins for _, _, mins in TREATMENTS]
+    except ValueError:
+        durations = None
+
+    if not durations or any(d <= 0 for d in durations):
+        return jsonify({
+            "success": False,
+            "message": "Durations must be positive minutes, e.g. 30,45,60"
+        }), 400
+
+    try:
+        from utils.slot_manager import SlotManager
+        slot_manager = SlotManager()
+        availability = slot_manager.get_availability_range(start_str, days, durations, doctor_id)
+
+        return jsonify({
+            "success": True,
+            "start": start_str,
+            "days": days,
+            "availability": availability
+        })
+    except Exception as e:
+        print(f"❌ Error fetching slot range: {e}")
+        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
+
+
+# -----------------------------------------
+# API: NEXT AVAILABLE SLOTS
+# -----------------------------------------
+MAX_NEXT_LIMIT = 20
+
+@bp.route("/api/available-slots/next", methods=["GET"])
+def get_next_available_slots():
+    if "user_id" not in session:
+        return jsonify({"success": False, "message": "Not logged in"}), 401
+
+    duration = request.args.get("duration", type=int)
+    limit = request.args.get("limit", 5, type=int)
+    days = request.args.get("days", 14, type=int)
+    start_str = request.args.get("from")
+    doctor_id = request.args.get("doctor_id", type=int)
+
+    if not duration or duration <= 0:
+        return jsonify({"success": False, "message": "Duration is required"}), 400
+
+    if not 1 <= limit <= MAX_NEXT_LIMIT or not 1 <= days <= MAX_RANGE_DAYS:
+        return jsonify({
+            "success": False,
+            "message": f"Limit must be 1-{MAX_NEXT_LIMIT} and days 1-{MAX_RANGE_DAYS}"
+        }), 400
+
+    try:
+        start_date = datetime.strptime(start_str, "%Y-%m-%d").date() if start_str else None
+    except ValueError:
+        return jsonify({"success": False, "message": "From must be a date (YYYY-MM-DD)"}), 400
+
+    try:
+        from utils.slot_manager import SlotManager
+        openings = SlotManager().find_next_available(
+            duration, start_date, limit=limit, max_days=days, doctor_id=doctor_id
+        )
+
+        return jsonify({
+            "success": True,
+            "duration": duration,
+            "openings": openings
+        })
+    except Exception as e:
+        print(f"❌ Error finding next slots: {e}")
+        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
+
 
 # -----------------------------------------
 # RUN
 # -----------------------------------------
 if __name__ == "__main__":
+    app = create_app()
+    with app.app_context():
+        init_db()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,297 @@
+"""
+ASGI entry point: the chat and availability endpoints run natively on the
+event loop, everything else is served by the Flask app
+
+- POST /chatbot, POST /chatbot/greet, GET /api/available-slots
+  Flowise calls are awaited (AsyncFlowiseClient), database work runs on a
+  small thread pool, so a slow LLM answer holds a coroutine, not a thread
+- every other route goes to the WSGI app through asgiref
+
+Usage: pip install uvicorn asgiref   (httpx optional, for non-blocking Flowise I/O)
+       uvicorn asgi:application --workers 2
+       (chat state is shared between workers through CONVERSATION_STORE)
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+from itsdangerous import BadSignature
+
+from app import (
+    create_app,
+    get_conversation_store,
+    flowise_chat_reply,
+    flowise_fallback_reply,
+    greeting_reply,
+    local_chat_reply,
+    FLOWISE_API_KEY,
+    FLOWISE_TIMEOUT,
+    FLOWISE_URL
+)
+from utils.conversation_store import ConversationState
+from utils.flowise_client import AsyncFlowiseClient, FlowiseUnavailable
+from utils.slot_manager import SlotManager
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+app = create_app()
+
+# Concurrent Flowise calls per process; far above the WSGI limit since a
+# waiting call costs a coroutine, not a worker
+ASYNC_FLOWISE_MAX_CONCURRENCY = int(os.getenv("ASYNC_FLOWISE_MAX_CONCURRENCY", 64))
+# Threads for database work; match the engine pool size
+ASGI_DB_THREADS = int(os.getenv("ASGI_DB_THREADS", 8))
+
+async_flowise = AsyncFlowiseClient(
+    FLOWISE_URL,
+    api_key=FLOWISE_API_KEY,
+    timeout=FLOWISE_TIMEOUT,
+    max_concurrency=ASYNC_FLOWISE_MAX_CONCURRENCY
+)
+
+db_executor = ThreadPoolExecutor(ASGI_DB_THREADS, thread_name_prefix="asgi-db")
+
+
+async def in_app(fn, *args):
+    """
+    Runs blocking (database) work on the pool, inside an app context so
+    Flask-SQLAlchemy scopes and cleans up its session per call.
+    """
+    def call():
+        with app.app_context():
+            return fn(*args)
+
+    return await asyncio.get_running_loop().run_in_executor(db_executor, call)
+
+
+# -----------------------------
+# Request / session plumbing
+# -----------------------------
+class Request:
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self.receive = receive
+        self.args = {
+            k: v[0] for k, v in
+            parse_qs(scope.get("query_string", b"").decode("latin-1")).items()
+        }
+
+    def header(self, name):
+        name = name.lower().encode("latin-1")
+        for key, value in self.scope.get("headers", []):
+            if key == name:
+                return value.decode("latin-1")
+        return None
+
+    async def json(self):
+        body = b""
+        while True:
+            message = await self.receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+
+def load_session(request):
+    """
+    The Flask cookie session (same signing key), as a session object
+    that tracks modification.
+    """
+    interface = app.session_interface
+    serializer = interface.get_signing_serializer(app)
+    cookie = SimpleCookie(request.header("cookie") or "")
+    morsel = cookie.get(interface.get_cookie_name(app))
+
+    data = {}
+    if morsel is not None and serializer is not None:
+        try:
+            data = serializer.loads(
+                morsel.value,
+                max_age=int(app.permanent_session_lifetime.total_seconds())
+            )
+        except BadSignature:
+            data = {}
+    return interface.session_class(data)
+
+
+def session_cookie_header(session):
+    """
+    Set-Cookie header for a modified session, None otherwise.
+    """
+    if not session.modified:
+        return None
+
+    interface = app.session_interface
+    cookie = SimpleCookie()
+    name = interface.get_cookie_name(app)
+    cookie[name] = interface.get_signing_serializer(app).dumps(dict(session))
+
+    morsel = cookie[name]
+    morsel["path"] = interface.get_cookie_path(app)
+    morsel["httponly"] = interface.get_cookie_httponly(app)
+    if interface.get_cookie_domain(app):
+        morsel["domain"] = interface.get_cookie_domain(app)
+    if interface.get_cookie_secure(app):
+        morsel["secure"] = True
+    if interface.get_cookie_samesite(app):
+        morsel["samesite"] = interface.get_cookie_samesite(app)
+    return morsel.OutputString()
+
+
+async def send_json(send, payload, status=200, session=None):
+    body = json.dumps(payload).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode("latin-1"))
+    ]
+    cookie = session_cookie_header(session) if session is not None else None
+    if cookie:
+        headers.append((b"set-cookie", cookie.encode("latin-1")))
+
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+# -----------------------------
+# Async endpoints
+# -----------------------------
+async def chatbot(request, session):
+    """
+    /chatbot: same routing as app.chatbot_reply, with the Flowise call
+    awaited instead of holding a thread.
+    """
+    data = await request.json()
+    user_message = str(data.get("message", "")).strip()
+
+    if not user_message:
+        return {"reply": "Please type something 🙂"}, 200
+
+    if "user_id" not in session:
+        return {"reply": "Please log in to continue 😊"}, 200
+
+    state = await in_app(lambda: ConversationState(get_conversation_store(), session))
+
+    # The `with` block of the WSGI view: the booking state is saved on
+    # success and left untouched if anything below raises
+    try:
+        reply, local_intent = await in_app(local_chat_reply, user_message, state)
+        if reply is None:
+            try:
+                payload = await async_flowise.ask(user_message)
+            except FlowiseUnavailable as e:
+                reply = await in_app(flowise_fallback_reply, user_message, state, local_intent, e)
+            else:
+                reply = await in_app(flowise_chat_reply, user_message, payload, state)
+    except BaseException as e:
+        await in_app(state.__exit__, type(e), e, e.__traceback__)
+        raise
+
+    await in_app(state.__exit__, None, None, None)
+    return reply, 200
+
+
+async def chatbot_greet(request, session):
+    return {"reply": greeting_reply(session)}, 200
+
+
+async def available_slots(request, session):
+    if "user_id" not in session:
+        return {"success": False, "message": "Not logged in"}, 401
+
+    date_str = request.args.get("date")
+    try:
+        duration = int(request.args.get("duration", ""))
+    except ValueError:
+        duration = None
+
+    try:
+        doctor_id = int(request.args["doctor_id"]) if request.args.get("doctor_id") else None
+    except ValueError:
+        doctor_id = None
+
+    if not date_str or not duration:
+        return {"success": False, "message": "Date and duration are required"}, 400
+
+    try:
+        available = await in_app(
+            lambda: SlotManager().get_available_start_times(date_str, duration, doctor_id)
+        )
+    except Exception as e:
+        print(f"❌ Error fetching slots: {e}")
+        return {"success": False, "message": f"Error: {str(e)}"}, 500
+
+    return {
+        "success": True,
+        "slots": available,
+        "date": date_str,
+        "duration": duration
+    }, 200
+
+
+ROUTES = {
+    ("POST", "/chatbot"): chatbot,
+    ("POST", "/chatbot/greet"): chatbot_greet,
+    ("GET", "/api/available-slots"): available_slots,
+}
+
+
+# -----------------------------
+# Application
+# -----------------------------
+flask_asgi = WsgiToAsgi(app) if WsgiToAsgi is not None else None
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await async_flowise.aclose()
+            db_executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    endpoint = None
+    if scope["type"] == "http":
+        endpoint = ROUTES.get((scope["method"], scope["path"]))
+
+    if endpoint is not None:
+        request = Request(scope, receive)
+        session = load_session(request)
+        try:
+            payload, status = await endpoint(request, session)
+        except Exception as e:
+            print(f"❌ Error in {scope['path']}: {e}")
+            await send_json(send, {"success": False, "message": f"Error: {str(e)}"}, 500)
+            return
+        await send_json(send, payload, status, session)
+        return
+
+    if flask_asgi is None:
+        await send_json(send, {
+            "success": False,
+            "message": "Install asgiref to serve the rest of the app from asgi.py"
+        }, 501)
+        return
+
+    await flask_asgi(scope, receive, send)
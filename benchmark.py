@@ -0,0 +1,365 @@
+"""
+Benchmark harness for the booking, chat, availability and dashboard paths
+
+Seeds a separate SQLite database with synthetic patients/appointments,
+starts the local Flowise stub, then drives the app in-process (Flask test
+clients, one per worker thread) and reports per scenario:
+    requests, errors, p50/p95/p99 latency, throughput, SQL queries/request
+
+Usage:
+    python benchmark.py                                  # defaults below
+    python benchmark.py --patients 500 --appointments 20000 --requests 400
+    python benchmark.py --save bench.json                # keep a baseline
+    python benchmark.py --compare bench.json             # exit 1 on regression
+
+The database is instance/benchmark.db unless --database-uri is given;
+clinic.db is never touched.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timedelta
+
+from flowise_stub import start_stub_server
+
+CHAT_MESSAGES = [
+    "hi",
+    "what are your clinic timings?",
+    "what is my appointment status",
+    "help",
+    "is it normal for gums to bleed a little after flossing?",
+    "how long does teeth whitening last?",
+    "do you accept walk-in patients on saturday afternoons?",
+]
+
+PROCEDURES = [
+    ("General Checkup", 15),
+    ("Cleaning / Scaling", 30),
+    ("Filling", 30),
+    ("Extraction", 45),
+    ("Root Canal Treatment", 60),
+]
+
+
+# -----------------------------
+# Setup
+# -----------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="MedBot benchmark harness")
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--appointments", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=60, help="spread of seeded dates around today")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--flowise-delay", type=float, default=0.2, help="stub seconds per answer")
+    parser.add_argument("--scenarios", default="availability,chat,booking,doctor_dashboard,doctor_appointments,patient_dashboard")
+    parser.add_argument("--database-uri", default=None, help="database to WIPE and seed")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from --save")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed p95 slowdown vs baseline (0.25 = +25%%)")
+    return parser.parse_args(argv)
+
+
+def build_app(args):
+    """
+    Points the app at the benchmark database and the stub before the app
+    module reads its configuration.
+    """
+    if args.database_uri:
+        os.environ["DATABASE_URI"] = args.database_uri
+    else:
+        os.makedirs("instance", exist_ok=True)
+        path = os.path.abspath(os.path.join("instance", "benchmark.db"))
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.environ["DATABASE_URI"] = f"sqlite:///{path}"
+
+    _, stub_url = start_stub_server(delay=args.flowise_delay)
+    os.environ["FLOWISE_URL"] = stub_url
+
+    from app import create_app, init_db
+    from models import db
+
+    app = create_app({"MAIL_OUTBOX_WORKER": "off"})
+    with app.app_context():
+        db.drop_all()
+        init_db()
+    return app
+
+
+def seed(app, args):
+    """
+    Bulk-inserts patients and appointments. Every patient shares one
+    password hash (hashing is deliberately slow) and the secret key "1234".
+    """
+    from werkzeug.security import generate_password_hash
+    from models import db, User, Appointment
+
+    rng = random.Random(args.seed)
+    password = generate_password_hash("bench")
+    today = date.today()
+    statuses = ["pending", "approved", "approved", "rejected", "completed"]
+
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {
+                "name": f"Patient {i}",
+                "username": f"patient{i}",
+                "email": f"patient{i}@bench.local",
+                "password": password,
+                "secret_key": "1234",
+                "role": "patient",
+            }
+            for i in range(args.patients)
+        ])
+        patient_ids = [u.id for u in User.query.filter_by(role="patient")]
+        doctor_id = User.query.filter_by(role="doctor").first().id
+
+        rows = []
+        for _ in range(args.appointments):
+            procedure, minutes = rng.choice(PROCEDURES)
+            rows.append({
+                "patient_id": rng.choice(patient_ids),
+                "doctor_id": doctor_id,
+                "appointment_date": today + timedelta(days=rng.randint(-args.days // 2, args.days // 2)),
+                "appointment_time": dt_time(rng.randint(9, 17), rng.choice([0, 15, 30, 45])),
+                "duration_minutes": minutes,
+                "procedure": procedure,
+                "status": rng.choice(statuses),
+                "source": "benchmark",
+                "created_at": datetime.utcnow(),
+            })
+        db.session.execute(Appointment.__table__.insert(), rows)
+        db.session.commit()
+
+    return patient_ids, doctor_id
+
+
+# -----------------------------
+# Measurement
+# -----------------------------
+class QueryCounter:
+    """
+    Counts SQL statements per thread, so each request's count is exact
+    even with several workers running.
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self._local = threading.local()
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self._local.n = getattr(self._local, "n", 0) + 1
+
+    def reset(self):
+        self._local.n = 0
+
+    @property
+    def value(self):
+        return getattr(self._local, "n", 0)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def login(client, user_id, role):
+    with client.session_transaction() as s:
+        s["user_id"] = user_id
+        s["role"] = role
+        s["username"] = f"user{user_id}"
+        if role == "doctor":
+            s["doctor_id"] = user_id
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+# Each returns (role, request function); the function gets a logged-in
+# test client and a random.Random and returns the response.
+def scenario_availability(ctx):
+    def run(client, rng):
+        day = date.today() + timedelta(days=rng.randint(0, ctx["days"] // 2))
+        duration = rng.choice(PROCEDURES)[1]
+        return client.get(f"/api/available-slots?date={day}&duration={duration}")
+    return "patient", run
+
+
+def scenario_chat(ctx):
+    def run(client, rng):
+        return client.post("/chatbot", json={"message": rng.choice(CHAT_MESSAGES)})
+    return "patient", run
+
+
+def scenario_booking(ctx):
+    def run(client, rng):
+        procedure, minutes = rng.choice(PROCEDURES)
+        day = date.today() + timedelta(days=rng.randint(1, ctx["days"] // 2))
+        return client.post("/book-appointment", data={
+            "secret_key": "1234",
+            "appointment_date": day.isoformat(),
+            "appointment_time": f"{rng.randint(9, 17):02d}:{rng.choice(['00', '15', '30', '45'])}",
+            "procedure": procedure,
+            "duration_minutes": minutes,
+            "reason": "benchmark",
+        })
+    return "patient", run
+
+
+def scenario_doctor_dashboard(ctx):
+    return "doctor", lambda client, rng: client.get("/doctor_dashboard")
+
+
+def scenario_doctor_appointments(ctx):
+    def run(client, rng):
+        return client.get(f"/doctor/appointments?filter={rng.choice(['all', 'upcoming', 'today'])}")
+    return "doctor", run
+
+
+def scenario_patient_dashboard(ctx):
+    return "patient", lambda client, rng: client.get("/patient/dashboard")
+
+
+SCENARIOS = {
+    "availability": scenario_availability,
+    "chat": scenario_chat,
+    "booking": scenario_booking,
+    "doctor_dashboard": scenario_doctor_dashboard,
+    "doctor_appointments": scenario_doctor_appointments,
+    "patient_dashboard": scenario_patient_dashboard,
+}
+
+
+def run_scenario(app, counter, name, ctx, args):
+    role, request_fn = SCENARIOS[name](ctx)
+    per_worker = [args.requests // args.concurrency] * args.concurrency
+    for i in range(args.requests % args.concurrency):
+        per_worker[i] += 1
+
+    def worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        client = app.test_client()
+        user_id = ctx["doctor_id"] if role == "doctor" else rng.choice(ctx["patient_ids"])
+        login(client, user_id, role)
+
+        samples = []
+        for _ in range(per_worker[index]):
+            counter.reset()
+            started = time.perf_counter()
+            try:
+                ok = request_fn(client, rng).status_code < 500
+            except Exception:
+                ok = False
+            samples.append((time.perf_counter() - started, counter.value, ok))
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        samples = [s for part in pool.map(worker, range(args.concurrency)) for s in part]
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(s[0] * 1000 for s in samples)
+    queries = [s[1] for s in samples]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not s[2]),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "queries_avg": round(statistics.mean(queries), 2) if queries else 0.0,
+        "queries_max": max(queries) if queries else 0,
+    }
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def print_report(results):
+    header = f"{'scenario':<22}{'reqs':>6}{'errs':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'q/req':>7}{'q max':>7}"
+    print("\n" + header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<22}{r['requests']:>6}{r['errors']:>6}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+              f"{r['p99_ms']:>9}{r['throughput_rps']:>9}{r['queries_avg']:>7}{r['queries_max']:>7}")
+    print()
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions vs a saved run: p95 slower than tolerance allows, more
+    queries per request, or new errors.
+    """
+    problems = []
+    for name, r in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        if r["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p95 {old['p95_ms']} → {r['p95_ms']} ms")
+        if r["queries_max"] > old["queries_max"]:
+            problems.append(f"{name}: queries/request {old['queries_max']} → {r['queries_max']}")
+        if r["errors"] > old["errors"]:
+            problems.append(f"{name}: errors {old['errors']} → {r['errors']}")
+    return problems
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenario(s): {', '.join(unknown)}")
+
+    app = build_app(args)
+
+    print(f"🌱 Seeding {args.patients} patients, {args.appointments} appointments...")
+    patient_ids, doctor_id = seed(app, args)
+    ctx = {"patient_ids": patient_ids, "doctor_id": doctor_id, "days": args.days}
+
+    from models import db
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+
+    results = {}
+    for name in names:
+        print(f"⏱️  {name}...")
+        results[name] = run_scenario(app, counter, name, ctx, args)
+
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"💾 Saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        problems = compare(results, baseline, args.tolerance)
+        if problems:
+            print("❌ Regressions vs baseline:")
+            for p in problems:
+                print(f"   - {p}")
+            sys.exit(1)
+        print("✅ No regressions vs baseline")
+
+
+if __name__ == "__main__":
+    main()
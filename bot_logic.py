@@ -1,23 +1,34 @@
-from datetime import datetime
-import json
-import random
+from datetime import datetime, timedelta
+from itertools import groupby
+import os
 
 from utils.slot_manager import SlotManager
 from utils.validators import (
     validate_secret_key,
-    validate_date,
-    validate_appointment_conflict
+    validate_date
 )
+from utils.booking import book_appointment
+from utils.keyword_matcher import KeywordMatcher
+from utils.response_catalog import ResponseCatalog
+from utils.conversation_store import STATE_KEYS
 from utils.mailer import send_email
-from models import db, Appointment, User
+from models import db, User
+from utils.queries import latest_appointment
 
 slot_manager = SlotManager()
 
 # -------------------------------
-# Load JSON responses
+# JSON responses (compiled on first use, reloaded when the file changes)
 # -------------------------------
-with open("clinic_responses.json", "r", encoding="utf-8") as f:
-    RESP = json.load(f)
+RESPONSES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "clinic_responses.json")
+# how often (seconds) each worker checks the file for edits
+RESPONSES_RELOAD_SECONDS = float(os.getenv("RESPONSES_RELOAD_SECONDS", 2))
+
+response_catalog = ResponseCatalog(RESPONSES_PATH, RESPONSES_RELOAD_SECONDS)
+
+
+def responses():
+    return response_catalog.raw
 
 # -------------------------------
 # Clinic Info (SAFE BACKEND DATA)
@@ -51,11 +62,25 @@ TREATMENTS = [
 # -------------------------------
 # Helpers
 # -------------------------------
+# Built once at import; earlier TREATMENTS entries win
+TREATMENT_MATCHER = KeywordMatcher(
+    [(keys, (proc, mins)) for keys, proc, mins in TREATMENTS]
+)
+
+
+# "earliest" etc. at the date step: show the next openings instead
+EARLIEST_MATCHER = KeywordMatcher([
+    (["earliest", "next available", "first available", "soonest", "asap", "any day"], True)
+])
+
+# openings listed when the patient asks for the earliest / picks a full day
+NEXT_OPENINGS = 6
+
+
 def map_reason_to_procedure(text):
-    text = text.lower()
-    for keys, proc, mins in TREATMENTS:
-        if any(k in text for k in keys):
-            return proc, mins
+    match = TREATMENT_MATCHER.best(text)
+    if match:
+        return match
     return None, None
 
 
@@ -69,21 +94,23 @@ def normalize_time(text):
 
 
 def pick(key, **kwargs):
-    msg = random.choice(RESP.get(key, RESP["fallback"]))
-    for k, v in kwargs.items():
-        msg = msg.replace(f"{{{{{k}}}}}", str(v))
-    return msg
+    return response_catalog.render(key, kwargs)
+
+
+def format_openings(openings):
+    """
+    [{"date", "time"}, ...] -> one bullet per day:
+    "• 2026-10-20 (Tue): 09:00, 09:15"
+    """
+    lines = []
+    for day, items in groupby(openings, key=lambda o: o["date"]):
+        weekday = datetime.strptime(day, "%Y-%m-%d").strftime("%a")
+        lines.append(f"• {day} ({weekday}): " + ", ".join(o["time"] for o in items))
+    return "\n".join(lines)
 
 
 def clear_booking(session):
-    for k in [
-        "booking_state",
-        "procedure",
-        "duration_minutes",
-        "appointment_date",
-        "appointment_time",
-        "secret_attempts"
-    ]:
+    for k in STATE_KEYS:
         session.pop(k, None)
 
 
@@ -98,11 +125,13 @@ def medbot_reply(intent_payload, session):
     if "user_id" not in session:
         return {"reply": pick("login_required")}
 
-    user = User.query.get(session["user_id"])
+    # The user row is only loaded by the steps that need it
+    user_id = session["user_id"]
     state = session.get("booking_state")
 
     # ---------------- Greeting ----------------
     if intent == "greeting":
+        user = db.session.get(User, user_id)
         return {"reply": pick("greeting", name=user.name)}
 
     # ---------------- Help ----------------
@@ -127,10 +156,7 @@ def medbot_reply(intent_payload, session):
 
     # ---------------- Appointment Status ----------------
     if intent == "status":
-        appt = Appointment.query.filter_by(patient_id=user.id).order_by(
-            Appointment.appointment_date.desc(),
-            Appointment.appointment_time.desc()
-        ).first()
+        appt = latest_appointment(user_id)
 
         if not appt:
             return {"reply": pick("status_none")}
@@ -164,16 +190,39 @@ def medbot_reply(intent_payload, session):
         return {"reply": pick("ask_date")}
 
     if state == "await_date":
+        if EARLIEST_MATCHER.best(msg):
+            openings = slot_manager.find_next_available(
+                session["duration_minutes"], limit=NEXT_OPENINGS
+            )
+            if not openings:
+                clear_booking(session)
+                return {"reply": pick("no_slots")}
+            return {"reply": pick("next_available", openings=format_openings(openings))}
+
         if not validate_date(msg):
             return {"reply": pick("invalid_date")}
 
-        slots = slot_manager.get_available_start_times(
+        date_obj = datetime.strptime(msg, "%Y-%m-%d").date()
+        is_open = slot_manager.is_open(date_obj)
+        slots = is_open and slot_manager.get_available_start_times(
             msg, session["duration_minutes"]
         )
 
         if not slots:
-            clear_booking(session)
-            return {"reply": pick("no_slots")}
+            # offer the next openings after that day instead of starting over;
+            # a closed day (Sunday, holiday) isn't "fully booked"
+            openings = slot_manager.find_next_available(
+                session["duration_minutes"],
+                date_obj + timedelta(days=1),
+                limit=NEXT_OPENINGS
+            )
+            if not openings:
+                clear_booking(session)
+                return {"reply": pick("no_slots" if is_open else "clinic_closed")}
+            return {"reply": pick(
+                "no_slots_next" if is_open else "clinic_closed_next",
+                openings=format_openings(openings)
+            )}
 
         session["appointment_date"] = msg
         session["booking_state"] = "await_time"
@@ -198,33 +247,30 @@ def medbot_reply(intent_payload, session):
             clear_booking(session)
             return {"reply": pick("too_many_attempts")}
 
+        user = db.session.get(User, user_id)
         if not validate_secret_key(msg) or msg != user.secret_key:
             return {"reply": pick("wrong_secret")}
 
         date_obj = datetime.strptime(session["appointment_date"], "%Y-%m-%d").date()
         time_obj = datetime.strptime(session["appointment_time"], "%H:%M").time()
 
-        ok, _ = validate_appointment_conflict(
-            user.id, 1, date_obj, time_obj
-        )
-
-        if not ok:
-            return {"reply": pick("slot_conflict")}
-
         procedure = session["procedure"]
 
-        # CREATE APPOINTMENT
-        db.session.add(Appointment(
+        # CREATE APPOINTMENT (conflict check + insert under one lock),
+        # with whichever doctor is free at that time
+        appointment, _ = book_appointment(
             patient_id=user.id,
-            doctor_id=1,
+            doctor_id=None,
             appointment_date=date_obj,
             appointment_time=time_obj,
-            procedure=procedure,
             duration_minutes=session["duration_minutes"],
+            procedure=procedure,
             status="pending",
             source="chatbot"
-        ))
-        db.session.commit()
+        )
+
+        if not appointment:
+            return {"reply": pick("slot_conflict")}
 
         # SEND CONFIRMATION EMAIL
         try:
@@ -239,7 +285,7 @@ def medbot_reply(intent_payload, session):
                 date=formatted_date,
                 time_slot=formatted_time
             )
-            print(f"✅ Confirmation email sent to {user.email}")
+            print(f"✅ Confirmation email queued for {user.email}")
         except Exception as e:
             print(f"⚠️ Email sending failed: {e}")
 
@@ -0,0 +1,122 @@
+"""
+Local stand-in for the Flowise prediction API, for tests and benchmarks
+Answers POST requests on any path with the JSON shape the chatflow returns:
+    {"json": {"reply": "...", "handoff": "none | booking | status"}}
+or, when the request has "streaming": true, the same object as a stream
+of server-sent token events, spread over --delay seconds.
+
+Usage: python flowise_stub.py [--port 3001] [--delay 0.2] [--fail-rate 0.1]
+Then:  FLOWISE_URL=http://127.0.0.1:3001/api/v1/prediction/stub python app.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HANDOFF_KEYWORDS = {
+    "booking": ["book", "appointment", "schedule"],
+    "status": ["status", "my appointment"],
+}
+
+
+def stub_answer(question):
+    lowered = question.lower()
+    handoff = "none"
+    for name, keywords in HANDOFF_KEYWORDS.items():
+        if any(k in lowered for k in keywords):
+            handoff = name
+    return {"reply": f"(stub) You asked: {question}", "handoff": handoff}
+
+
+def make_handler(delay=0.0, fail_rate=0.0):
+
+    class FlowiseStubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, like the real server
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            answer = stub_answer(body.get("question", ""))
+
+            if body.get("streaming"):
+                self._stream(json.dumps(answer))
+                return
+
+            if delay:
+                time.sleep(delay)
+
+            if fail_rate and random.random() < fail_rate:
+                self._send(500, {"error": "stub failure"})
+                return
+
+            self._send(200, {"json": answer})
+
+        def _stream(self, text):
+            if fail_rate and random.random() < fail_rate:
+                self._send(500, {"error": "stub failure"})
+                return
+
+            tokens = [text[i:i + 4] for i in range(0, len(text), 4)]
+            pause = delay / max(len(tokens), 1)
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            for token in tokens:
+                time.sleep(pause)
+                self._chunk({"event": "token", "data": token})
+            self._chunk({"event": "end", "data": "[DONE]"})
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _chunk(self, message):
+            data = f"message:\ndata: {json.dumps(message)}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FlowiseStubHandler
+
+
+def start_stub_server(port=0, delay=0.0, fail_rate=0.0):
+    """
+    Starts the stub in a daemon thread and returns (server, url).
+    port=0 picks a free port.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(delay, fail_rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/prediction/stub"
+    return server, url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Flowise stub server")
+    parser.add_argument("--port", type=int, default=3001)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds per answer")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="0..1 share of HTTP 500s")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", args.port), make_handler(args.delay, args.fail_rate)
+    )
+    print(f"🤖 Flowise stub on http://127.0.0.1:{args.port}/api/v1/prediction/stub")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,98 @@
+"""
+Database migration script to add the appointment indexes declared in models.py
+Safe to run more than once (CREATE INDEX IF NOT EXISTS).
+Prints the query plans of the hot queries before and after.
+
+Usage: python migrate_add_indexes.py
+"""
+
+import sqlite3
+import os
+
+INDEXES = [
+    ("ix_appointments_doctor_date_time",
+     "appointments (doctor_id, appointment_date, appointment_time)"),
+    ("ix_appointments_patient_date_time",
+     "appointments (patient_id, appointment_date, appointment_time)"),
+    ("ix_appointments_date_time",
+     "appointments (appointment_date, appointment_time)"),
+    ("ix_appointments_status_date",
+     "appointments (status, appointment_date)"),
+]
+
+# Representative queries from app.py / bot_logic.py / utils
+HOT_QUERIES = [
+    ("Slot manager (day timeline)",
+     "SELECT appointment_time, duration_minutes FROM appointments "
+     "WHERE appointment_date = '2025-01-01' AND status IN ('pending', 'approved')"),
+    ("Conflict check (doctor)",
+     "SELECT id FROM appointments "
+     "WHERE doctor_id = 1 AND appointment_date = '2025-01-01'"),
+    ("Chatbot status / patient dashboard",
+     "SELECT id FROM appointments WHERE patient_id = 2 "
+     "ORDER BY appointment_date DESC, appointment_time DESC LIMIT 1"),
+    ("Doctor dashboard (today)",
+     "SELECT id FROM appointments WHERE appointment_date = '2025-01-01' "
+     "ORDER BY appointment_time"),
+    ("Doctor dashboard (emergencies)",
+     "SELECT id FROM appointments WHERE status = 'Emergency' ORDER BY id DESC"),
+]
+
+
+def print_query_plans(cursor, title):
+    print("\n" + "="*70)
+    print(f"🔎 QUERY PLANS ({title})")
+    print("="*70)
+    for name, sql in HOT_QUERIES:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql)
+        print(f"\n{name}:")
+        for row in cursor.fetchall():
+            print(f"   {row[-1]}")
+
+
+def migrate_database():
+    # Path to your database
+    db_path = os.path.join('instance', 'clinic.db')
+    
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found at {db_path}")
+        return
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA index_list(appointments)")
+        existing = {row[1] for row in cursor.fetchall()}
+
+        print_query_plans(cursor, "before")
+
+        print("\n🔄 Creating indexes...")
+        for name, target in INDEXES:
+            if name in existing:
+                print(f"✅ {name} already exists")
+                continue
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+            print(f"✅ {name} created")
+
+        # Refresh planner statistics so the new indexes get picked
+        cursor.execute("ANALYZE appointments")
+        conn.commit()
+
+        print_query_plans(cursor, "after")
+
+        conn.close()
+
+        print("\n✅ Migration completed successfully!")
+        
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        if 'conn' in locals():
+            conn.rollback()
+            conn.close()
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("DATABASE MIGRATION: Adding Appointment Indexes")
+    print("="*70 + "\n")
+    migrate_database()
@@ -0,0 +1,52 @@
+"""
+Database migration script for the slot inventory (utils/slot_inventory.py)
+The old `slots` table (date, slot_time, is_available) was never populated;
+it is replaced by the per-doctor table declared in models.py, then the
+inventory is materialized for the next weeks.
+
+Usage: python migrate_slot_inventory.py [weeks]
+       then set SLOT_INVENTORY=on
+"""
+
+import sys
+
+from sqlalchemy import inspect
+
+from app import create_app
+from models import db, Slot
+from utils.slot_inventory import materialize_slots
+from utils.slot_manager import SlotManager
+
+
+def migrate_database(weeks=4):
+    with create_app().app_context():
+        try:
+            inspector = inspect(db.engine)
+            if inspector.has_table("slots"):
+                columns = {c["name"] for c in inspector.get_columns("slots")}
+                if "doctor_id" not in columns:
+                    old_rows = db.session.query(db.func.count()).select_from(Slot.__table__).scalar()
+                    db.session.commit()
+                    Slot.__table__.drop(db.engine)
+                    print(f"✅ Dropped old slots table ({old_rows} rows)")
+                else:
+                    print("✅ slots table already migrated")
+
+            db.create_all()
+            print("✅ slots table ready")
+
+            created = materialize_slots(SlotManager(inventory=False), days=weeks * 7)
+            print(f"✅ Materialized {created} slots for the next {weeks} weeks")
+
+            print("\n✅ Migration completed successfully! Set SLOT_INVENTORY=on to use it.")
+
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("DATABASE MIGRATION: Slot Inventory")
+    print("="*70 + "\n")
+    migrate_database(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
@@ -41,12 +41,66 @@ class User(db.Model):
         return f"<User {self.username} ({self.role})>"
 
 
+# -----------------------------------------
+# DOCTOR WORKING HOURS (one row per doctor, optional)
+# -----------------------------------------
+class DoctorSchedule(db.Model):
+    __tablename__ = 'doctor_schedules'
+
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False)
+
+    start_time = db.Column(db.Time, nullable=False)
+    lunch_start = db.Column(db.Time)            # no lunch break if empty
+    lunch_end = db.Column(db.Time)
+    end_time = db.Column(db.Time, nullable=False)
+    step_minutes = db.Column(db.Integer, default=15)
+
+    doctor = db.relationship('User', backref=db.backref('schedule', uselist=False))
+
+    def __repr__(self):
+        return f"<DoctorSchedule doctor={self.doctor_id}>"
+
+
+# -----------------------------------------
+# CLINIC CALENDAR EXCEPTIONS (holidays, closures, short days)
+# -----------------------------------------
+class CalendarException(db.Model):
+    __tablename__ = 'calendar_exceptions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, unique=True, nullable=False)
+
+    # both empty = closed all day, otherwise the clinic's hours that day
+    open_time = db.Column(db.Time)
+    close_time = db.Column(db.Time)
+    reason = db.Column(db.String(100))
+
+    def __repr__(self):
+        return f"<CalendarException {self.date}>"
+
+
 # -----------------------------------------
 # APPOINTMENT MODEL
 # -----------------------------------------
 class Appointment(db.Model):
     __tablename__ = 'appointments'
 
+    # Indexes for the hot queries (keep in sync with migrate_add_indexes.py):
+    # - doctor timeline / conflict checks: doctor + date + time
+    # - patient dashboard / chatbot status: patient + date + time
+    # - dashboards / slot manager: date + time, status + date
+    __table_args__ = (
+        db.Index('ix_appointments_doctor_date_time',
+                 'doctor_id', 'appointment_date', 'appointment_time'),
+        db.Index('ix_appointments_patient_date_time',
+                 'patient_id', 'appointment_date', 'appointment_time'),
+        db.Index('ix_appointments_date_time',
+                 'appointment_date', 'appointment_time'),
+        db.Index('ix_appointments_status_date',
+                 'status', 'appointment_date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     patient_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -89,16 +143,54 @@ class Emergency(db.Model):
 
 
 # -----------------------------------------
-# SLOT MODEL (still there for API endpoints)
+# EMAIL OUTBOX (sent by utils/mailer.py worker)
+# -----------------------------------------
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    html = db.Column(db.Text, nullable=False)   # rendered when queued
+
+    status = db.Column(db.String(20), default='queued')   # queued / sending / sent / failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<EmailOutbox {self.id} {self.status}>"
+
+
+# -----------------------------------------
+# SLOT INVENTORY (materialized by utils/slot_inventory.py)
 # -----------------------------------------
 class Slot(db.Model):
     __tablename__ = 'slots'
 
+    # one row per doctor per step-sized cell of a working day; a booking
+    # claims the cells it covers (see utils/slot_inventory.claim_slots)
+    __table_args__ = (
+        db.Index('ix_slots_doctor_date_time',
+                 'doctor_id', 'date', 'slot_time', unique=True),
+        db.Index('ix_slots_appointment', 'appointment_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
+    doctor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     slot_time = db.Column(db.Time, nullable=False)
     is_available = db.Column(db.Boolean, default=True)
     date = db.Column(db.Date, nullable=False)
 
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'))
+
     def __repr__(self):
-        return f"<Slot {self.slot_time} - {self.date}>"
\ No newline at end of file
+        return f"<Slot {self.slot_time} - {self.date}>"
@@ -113,6 +113,8 @@ function addMessage(sender, text) {
     } else {
         receiveSound.play().catch(() => {});
     }
+
+    return div;
 }
 
 // =============================
@@ -223,18 +225,7 @@ async function sendMessage() {
     showTyping();
 
     try {
-        const res = await fetch("/chatbot", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ message })
-        });
-
-        const data = await res.json();
-        removeTyping();
-
-        if (data.reply) {
-            addMessage("bot", data.reply);
-        }
+        await streamReply(message);
 
     } catch (err) {
         removeTyping();
@@ -248,6 +239,86 @@ async function sendMessage() {
     }
 }
 
+// =============================
+// Streaming reply (server-sent events over fetch)
+// =============================
+// "token" events are appended to one bubble as they arrive; the "done"
+// event holds the final reply, which replaces the streamed text (it
+// differs when the bot hands off to booking/status).
+async function streamReply(message) {
+    const res = await fetch("/chatbot/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ message })
+    });
+
+    if (!res.ok || !res.body) {
+        return fetchReply(message);
+    }
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let bubble = null;
+
+    const render = (text, replace) => {
+        if (!bubble) {
+            removeTyping();
+            bubble = addMessage("bot", "");
+        }
+        bubble.innerText = replace ? text : bubble.innerText + text;
+        msgBox.scrollTop = msgBox.scrollHeight;
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const frames = buffer.split("\n\n");
+        buffer = frames.pop();
+
+        for (const frame of frames) {
+            let event = "message";
+            let data = "";
+            for (const line of frame.split("\n")) {
+                if (line.startsWith("event:")) event = line.slice(6).trim();
+                else if (line.startsWith("data:")) data += line.slice(5).trim();
+            }
+            if (!data) continue;
+
+            const payload = JSON.parse(data);
+            if (event === "token") {
+                render(payload.text, false);
+            } else if (event === "done") {
+                if (payload.reply) render(payload.reply, true);
+                else removeTyping();
+                return;
+            }
+        }
+    }
+
+    // Stream ended without "done"
+    removeTyping();
+    if (!bubble) addMessage("bot", "⚠️ Oops! Something went wrong. Please try again.");
+}
+
+// Non-streaming fallback
+async function fetchReply(message) {
+    const res = await fetch("/chatbot", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ message })
+    });
+
+    const data = await res.json();
+    removeTyping();
+
+    if (data.reply) {
+        addMessage("bot", data.reply);
+    }
+}
+
 // =============================
 // Events
 // =============================
@@ -0,0 +1,27 @@
+import pytest
+
+from app import create_app
+from models import db
+from utils.availability_cache import availability_cache
+from utils.conversation_store import MemoryConversationStore
+from utils.dashboard_summary import DashboardSummary
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "MAIL_OUTBOX_WORKER": "off",
+    })
+    # process-wide: don't carry doctors or days over from another test's database
+    availability_cache.clear()
+    summary = DashboardSummary()
+    monkeypatch.setattr("app.dashboard_summary", summary)
+    monkeypatch.setattr("utils.dashboard_summary.dashboard_summary", summary)
+    monkeypatch.setattr("app._conversation_store", MemoryConversationStore())
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
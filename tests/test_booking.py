@@ -0,0 +1,71 @@
+"""
+Booking checks (utils.booking.book_appointment).
+
+Run: python -m pytest -q
+"""
+
+from datetime import date, time, timedelta
+
+import pytest
+
+from models import db, User, Appointment
+from utils.booking import book_appointment
+
+
+def next_monday():
+    today = date.today()
+    return today + timedelta(days=7 - today.weekday())
+
+
+@pytest.fixture
+def people(app):
+    doctor = User(name="Dr. Test", username="doctor", email="doctor@test.local",
+                  password="x", role="doctor")
+    patient = User(name="Patient", username="patient", email="patient@test.local",
+                   password="x", secret_key="1234", role="patient")
+    other = User(name="Other", username="other", email="other@test.local",
+                 password="x", secret_key="1234", role="patient")
+    db.session.add_all([doctor, patient, other])
+    db.session.commit()
+
+    # the patient's own booking, 10:00-10:30
+    db.session.add(Appointment(
+        patient_id=patient.id, doctor_id=doctor.id,
+        appointment_date=next_monday(), appointment_time=time(10, 0),
+        duration_minutes=30, status="pending",
+    ))
+    db.session.commit()
+    return doctor.id, patient.id, other.id
+
+
+def test_any_doctor_reports_the_patients_own_overlap(people):
+    doctor_id, patient_id, _ = people
+
+    appointment, message = book_appointment(
+        patient_id, None, next_monday(), time(10, 15), 30
+    )
+
+    assert appointment is None
+    assert message == "You already have an appointment at this time."
+
+
+def test_any_doctor_reports_no_doctor_for_another_patient(people):
+    _, _, other_id = people
+
+    appointment, message = book_appointment(
+        other_id, None, next_monday(), time(10, 15), 30
+    )
+
+    assert appointment is None
+    assert message == "No doctor is available at this time."
+
+
+def test_any_doctor_books_a_free_time(people):
+    doctor_id, patient_id, _ = people
+
+    appointment, message = book_appointment(
+        patient_id, None, next_monday(), time(11, 0), 30
+    )
+
+    assert message is None
+    assert appointment.doctor_id == doctor_id
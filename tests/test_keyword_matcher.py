@@ -0,0 +1,39 @@
+"""
+Typo tolerance of the shared keyword matcher (utils.keyword_matcher):
+misspelled procedures still match, ordinary words one edit away don't.
+
+Run: python -m pytest -q
+"""
+
+import pytest
+
+from bot_logic import map_reason_to_procedure, TREATMENT_MATCHER
+from app import BOOKING_MATCHER
+
+
+@pytest.mark.parametrize("text, procedure", [
+    ("I need a fillling", "Filling"),
+    ("teeth cleanig please", "Cleaning / Scaling"),
+    ("tooth exraction", "Extraction"),
+    ("emergancy!", "Emergency Visit"),
+    ("two fillings", "Filling"),
+])
+def test_typos_of_procedures_match(text, procedure):
+    assert TREATMENT_MATCHER.best(text)[0] == procedure
+
+
+@pytest.mark.parametrize("text", [
+    "I'm willing to pay",
+    "killing pain",
+    "falling",
+    "billing question",
+    "clearing my throat",
+    "scaring me",
+])
+def test_ordinary_words_are_not_procedures(text):
+    assert map_reason_to_procedure(text) == (None, None)
+
+
+@pytest.mark.parametrize("text", ["clearing my throat", "scaring me", "booth"])
+def test_booking_keywords_match_exactly(text):
+    assert not BOOKING_MATCHER.matches(text)
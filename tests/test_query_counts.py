@@ -0,0 +1,191 @@
+"""
+Query counts of the doctor and patient pages and of a chatbot status turn
+stay constant as appointments grow (no N+1 on patients, no per-row lazy
+loads), both for the query helpers and for the rendered pages.
+
+Run: python -m pytest -q
+"""
+
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models import db, User, Appointment
+from utils.queries import appointment_page, doctor_dashboard_data
+
+SIZES = (5, 80)
+
+
+def seed(count):
+    """
+    One doctor, `count` patients with one appointment each, spread over
+    yesterday / today / the coming days, a few of them emergencies.
+    """
+    doctor = User(name="Dr. Test", username="doctor", email="doctor@test.local",
+                  password="x", role="doctor")
+    db.session.add(doctor)
+    db.session.flush()
+
+    today = date.today()
+    for i in range(count):
+        patient = User(name=f"Patient {i}", username=f"patient{i}",
+                       email=f"patient{i}@test.local", password="x",
+                       secret_key="1234", role="patient")
+        db.session.add(patient)
+        db.session.flush()
+        db.session.add(Appointment(
+            patient_id=patient.id,
+            doctor_id=doctor.id,
+            appointment_date=today + timedelta(days=i % 4 - 1),
+            appointment_time=time(9 + i % 8, 15 * (i % 4)),
+            duration_minutes=30,
+            status="Emergency" if i % 10 == 0 else "pending",
+        ))
+    db.session.commit()
+    # start from an empty identity map, like a fresh request
+    db.session.expunge_all()
+    return today
+
+
+def login(client, user_id, role):
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
+        session["role"] = role
+        if role == "doctor":
+            session["doctor_id"] = user_id
+
+
+def request_queries(client, method, url, **kwargs):
+    """
+    (SQL statements, response) of one request through the test client,
+    rendering included.
+    """
+    with count_queries() as counter:
+        response = client.open(url, method=method, **kwargs)
+    assert response.status_code == 200
+    db.session.remove()   # next request starts from an empty session
+    return counter["n"], response
+
+
+@contextmanager
+def count_queries():
+    counter = {"n": 0}
+
+    def before_cursor_execute(*args):
+        counter["n"] += 1
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def touch_rows(appointments):
+    """
+    Reads what the templates render, so lazy loads would be counted.
+    """
+    for appointment in appointments:
+        appointment.appointment_date, appointment.status
+        if appointment.patient is not None:
+            appointment.patient.name
+
+
+def appointment_pages_queries(today):
+    counts = []
+    cursor = None
+    for _ in range(2):
+        with count_queries() as counter:
+            rows, cursor = appointment_page("all", today, cursor=cursor, limit=20)
+            touch_rows(rows)
+        counts.append(counter["n"])
+        if cursor is None:
+            break
+    return counts
+
+
+def dashboard_queries(today):
+    with count_queries() as counter:
+        data = doctor_dashboard_data(today)
+        for key in ("appointments", "upcoming_appointments", "emergencies"):
+            touch_rows(data[key])
+            for appointment in data[key]:
+                appointment.patient.username
+    return counter["n"]
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_appointment_page_is_one_query_per_page(app, count):
+    today = seed(count)
+
+    for queries in appointment_pages_queries(today):
+        assert queries == 1
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_doctor_dashboard_is_three_queries(app, count):
+    today = seed(count)
+
+    assert dashboard_queries(today) == 3
+
+
+# -----------------------------
+# Pages (test client)
+# -----------------------------
+@pytest.mark.parametrize("count", SIZES)
+def test_doctor_dashboard_page_budget(app, count):
+    seed(count)
+    client = app.test_client()
+    login(client, 1, "doctor")
+
+    # first request builds the in-memory summary, later ones are served from it
+    assert request_queries(client, "GET", "/doctor_dashboard")[0] == 3
+    assert request_queries(client, "GET", "/doctor_dashboard")[0] == 0
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_doctor_appointments_page_budget(app, count):
+    seed(count)
+    client = app.test_client()
+    login(client, 1, "doctor")
+
+    assert request_queries(client, "GET", "/doctor/appointments?filter=all")[0] == 1
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_patient_dashboard_page_budget(app, count):
+    seed(count)
+    patient_id = User.query.filter_by(username="patient1").one().id
+    for i in range(count):
+        db.session.add(Appointment(
+            patient_id=patient_id, doctor_id=1,
+            appointment_date=date.today() + timedelta(days=7 + i),
+            appointment_time=time(10, 0), duration_minutes=30, status="pending",
+        ))
+    db.session.commit()
+    db.session.remove()
+
+    client = app.test_client()
+    login(client, patient_id, "patient")
+
+    # the patient row, then their appointments
+    assert request_queries(client, "GET", "/patient/dashboard")[0] == 2
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_chatbot_status_turn_budget(app, count):
+    seed(count)
+    patient_id = User.query.filter_by(username="patient1").one().id
+    db.session.remove()
+
+    client = app.test_client()
+    login(client, patient_id, "patient")
+
+    # routed locally (no Flowise call), answered from latest_appointment()
+    queries, response = request_queries(
+        client, "POST", "/chatbot", json={"message": "check my appointment"}
+    )
+    assert queries == 1
+    assert "Status: Pending" in response.get_json()["reply"]
@@ -5,11 +5,11 @@ Run this AFTER migrate_add_email.py and AFTER updating models.py
 Usage: python update_emails.py
 """
 
-from app import app, db
-from models import User
+from app import create_app
+from models import db, User
 
 def update_emails():
-    with app.app_context():
+    with create_app().app_context():
         try:
             # Get all users
             users = User.query.all()
@@ -0,0 +1,133 @@
+# utils/availability_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+class MemoryCacheBackend:
+    """
+    In-process LRU cache with a per-entry TTL.
+    Any object with the same get/set/delete/clear methods (e.g. a thin
+    Redis wrapper) can be passed to AvailabilityCache instead.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# -----------------------------
+# Availability cache
+# -----------------------------
+class AvailabilityCache:
+    """
+    Busy blocks per (doctor, date), as [(start_min, end_min), ...], plus
+    the doctors' working hours and the clinic calendar exceptions.
+
+    Entries are written on read (cache miss -> query -> set) and dropped by
+    the booking write paths, so slot browsing only touches the database once
+    per day until someone books, rejects or cancels on that day.
+
+    The default backend is per process: other workers see a change once
+    their entry expires (TTL). Booking itself always re-checks conflicts
+    against the database, so a stale entry can never cause a double booking.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryCacheBackend()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, appt_date, doctor_id):
+        return f"avail:{doctor_id or 'all'}:{appt_date.isoformat()}"
+
+    def get_day(self, appt_date, doctor_id=None):
+        blocks = self.backend.get(self._key(appt_date, doctor_id))
+        if blocks is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return blocks
+
+    def set_day(self, appt_date, blocks, doctor_id=None):
+        self.backend.set(self._key(appt_date, doctor_id), list(blocks))
+
+    def invalidate(self, appt_date, doctor_id=None):
+        """
+        Drops the doctor's entry for that date and the clinic-wide one,
+        which is derived from every doctor's appointments.
+        """
+        if doctor_id is not None:
+            self.backend.delete(self._key(appt_date, doctor_id))
+        self.backend.delete(self._key(appt_date, None))
+
+    def get_doctors(self):
+        """
+        Cached {doctor_id: DoctorHours}; None on a miss.
+        """
+        return self.backend.get("avail:doctors")
+
+    def set_doctors(self, hours):
+        self.backend.set("avail:doctors", dict(hours))
+
+    def invalidate_doctors(self):
+        """
+        Drops the doctor list after a doctor or schedule is added/changed.
+        """
+        self.backend.delete("avail:doctors")
+
+    def get_calendar(self):
+        """
+        Cached {date: windows} of the clinic's calendar exceptions; None on
+        a miss.
+        """
+        return self.backend.get("avail:calendar")
+
+    def set_calendar(self, exceptions):
+        self.backend.set("avail:calendar", dict(exceptions))
+
+    def invalidate_calendar(self):
+        self.backend.delete("avail:calendar")
+
+    def clear(self):
+        self.backend.clear()
+
+
+# Shared by every SlotManager in the process
+availability_cache = AvailabilityCache()
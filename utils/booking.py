@@ -0,0 +1,132 @@
+# utils/booking.py
+
+from models import db, User, Appointment
+from utils.validators import validate_appointment_conflict
+from utils.slot_manager import SlotManager, SLOT_INVENTORY
+from utils.slot_inventory import claim_slots
+from utils.events import notify_appointment_changed
+
+
+# -----------------------------
+# Schedule lock
+# -----------------------------
+def lock_schedules(*user_ids):
+    """
+    Takes a write lock covering the given users' schedules for the rest of
+    the current transaction, by issuing a no-op UPDATE on their rows:
+    - SQLite: the first write of a transaction grabs the database RESERVED
+      lock, so other bookings wait (busy timeout) until we commit
+    - PostgreSQL/MySQL: row locks on the patient and doctor rows, so only
+      bookings touching the same people are serialized
+    """
+    users = User.__table__
+    db.session.execute(
+        users.update()
+        .where(users.c.id.in_(sorted(set(user_ids))))
+        .values(id=users.c.id)
+    )
+
+
+# -----------------------------
+# Atomic booking
+# -----------------------------
+def book_appointment(patient_id, doctor_id, appointment_date, appointment_time,
+                     duration_minutes=30, **fields):
+    """
+    Checks for overlaps and inserts the appointment in one transaction,
+    while holding the schedule lock, so two concurrent requests can't both
+    pass the check for the same time. With the slot inventory on, the
+    covered slot cells are claimed in the same transaction.
+
+    doctor_id=None books with any doctor free at that time (see
+    `book_with_any_doctor`). An explicit doctor_id must be a doctor, and
+    the block must be one their schedule offers (hours, lunch, calendar).
+
+    Returns (appointment, None) on success, (None, message) on conflict.
+    """
+    if doctor_id is None:
+        return book_with_any_doctor(
+            patient_id, appointment_date, appointment_time,
+            duration_minutes, **fields
+        )
+
+    slot_manager = SlotManager()
+    try:
+        offered = slot_manager.offers_start(
+            appointment_date, appointment_time, duration_minutes, doctor_id
+        )
+    except ValueError:
+        return None, "Please choose a valid doctor."
+    if not offered:
+        return None, "That time is outside the doctor's working hours."
+
+    try:
+        lock_schedules(patient_id, doctor_id)
+
+        ok, conflict_msg = validate_appointment_conflict(
+            patient_id, doctor_id, appointment_date, appointment_time,
+            duration_minutes
+        )
+        if not ok:
+            db.session.rollback()
+            return None, conflict_msg
+
+        appointment = Appointment(
+            patient_id=patient_id,
+            doctor_id=doctor_id,
+            appointment_date=appointment_date,
+            appointment_time=appointment_time,
+            duration_minutes=duration_minutes,
+            **fields
+        )
+        db.session.add(appointment)
+
+        if SLOT_INVENTORY:
+            # one conditional UPDATE on the covered slot cells; None means
+            # the day isn't materialized and the check above is enough
+            db.session.flush()
+            if claim_slots(slot_manager, appointment) is False:
+                db.session.rollback()
+                return None, "This time slot is no longer available."
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    notify_appointment_changed(appointment)
+    return appointment, None
+
+
+def book_with_any_doctor(patient_id, appointment_date, appointment_time,
+                         duration_minutes=30, **fields):
+    """
+    Tries the doctors whose timeline is free at that time, least booked
+    first, until one booking goes through. The candidate list comes from
+    the availability cache; each attempt re-checks under the lock, so a
+    stale entry only costs a retry with the next doctor.
+
+    The patient's own bookings are checked first: the candidates only look
+    at the doctors' timelines, and an overlap with the patient's own
+    appointment isn't "no doctor available".
+    """
+    ok, conflict_msg = validate_appointment_conflict(
+        patient_id, None, appointment_date, appointment_time, duration_minutes
+    )
+    if not ok:
+        return None, conflict_msg
+
+    candidates = SlotManager().doctors_free_at(
+        appointment_date, appointment_time, duration_minutes
+    )
+
+    conflict_msg = "No doctor is available at this time."
+    for doctor_id in candidates:
+        appointment, conflict_msg = book_appointment(
+            patient_id, doctor_id, appointment_date, appointment_time,
+            duration_minutes, **fields
+        )
+        if appointment:
+            return appointment, None
+
+    return None, conflict_msg
@@ -0,0 +1,127 @@
+# utils/clinic_calendar.py
+
+from functools import lru_cache
+
+from models import db, CalendarException
+from utils.day_schedule import to_minutes
+from utils.availability_cache import availability_cache
+
+# Clinic opening hours per weekday (Monday = 0), as "HH:MM-HH:MM" ranges.
+# An empty list is a closed day. Doctors' own hours are clipped to these.
+DEFAULT_WEEK = {
+    0: ["09:00-19:00"],
+    1: ["09:00-19:00"],
+    2: ["09:00-19:00"],
+    3: ["09:00-19:00"],
+    4: ["09:00-19:00"],
+    5: ["09:00-19:00"],
+    6: [],
+}
+
+CLOSED = ()
+
+
+# -----------------------------
+# Compiling
+# -----------------------------
+def compile_windows(ranges):
+    """
+    ["09:00-13:00", ...] or [(start, end), ...] ("HH:MM" / datetime.time)
+    -> sorted tuple of (start_min, end_min) windows.
+    """
+    windows = []
+    for item in ranges:
+        if isinstance(item, str):
+            item = item.split("-")
+        start, end = (to_minutes(v.strip() if isinstance(v, str) else v) for v in item)
+        if end > start:
+            windows.append((start, end))
+    return tuple(sorted(windows))
+
+
+@lru_cache(maxsize=256)
+def intersect_windows(a, b):
+    """
+    Overlap of two sorted window tuples, e.g. a doctor's hours clipped to
+    the clinic's opening hours for that day. Cached: there are only a few
+    distinct (day template, doctor hours) pairs.
+    """
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start = max(a[i][0], b[j][0])
+        end = min(a[i][1], b[j][1])
+        if start < end:
+            result.append((start, end))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return tuple(result)
+
+
+# -----------------------------
+# Calendar
+# -----------------------------
+class ClinicCalendar:
+    """
+    When the clinic is open:
+    - weekday templates, compiled once into minute windows
+    - exception dates (holidays, closures, short days) from the
+      calendar_exceptions table, loaded in one query and cached with the
+      availability data
+
+    A closed date has no windows, so availability can skip it without
+    touching the appointments table.
+    """
+
+    def __init__(self, week=None, cache=availability_cache):
+        week = DEFAULT_WEEK if week is None else week
+        self.week = tuple(compile_windows(week.get(day, [])) for day in range(7))
+        self.cache = cache
+
+    def exceptions(self):
+        """
+        {date: windows} for every calendar exception (CLOSED = all day).
+        """
+        exceptions = self.cache.get_calendar() if self.cache is not None else None
+        if exceptions is None:
+            rows = db.session.query(
+                CalendarException.date,
+                CalendarException.open_time,
+                CalendarException.close_time
+            ).all()
+
+            exceptions = {}
+            for day_date, open_time, close_time in rows:
+                if open_time is None or close_time is None:
+                    exceptions[day_date] = CLOSED
+                else:
+                    exceptions[day_date] = compile_windows([(open_time, close_time)])
+
+            if self.cache is not None:
+                self.cache.set_calendar(exceptions)
+        return exceptions
+
+    def opening(self, day_date):
+        """
+        The clinic's windows on `day_date`; CLOSED if it is shut.
+        """
+        windows = self.exceptions().get(day_date)
+        if windows is None:
+            windows = self.week[day_date.weekday()]
+        return windows
+
+    def is_open(self, day_date):
+        return bool(self.opening(day_date))
+
+    def day_windows(self, day_date, windows):
+        """
+        `windows` (a doctor's hours) limited to the clinic's opening hours
+        on `day_date`.
+        """
+        return intersect_windows(tuple(windows), self.opening(day_date))
+
+
+# Shared by every SlotManager in the process
+clinic_calendar = ClinicCalendar()
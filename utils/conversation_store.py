@@ -0,0 +1,215 @@
+# utils/conversation_store.py
+
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+# Booking-flow keys kept server side (everything else stays in the cookie)
+STATE_KEYS = (
+    "booking_state",
+    "procedure",
+    "duration_minutes",
+    "appointment_date",
+    "appointment_time",
+    "secret_attempts",
+)
+
+SESSION_ID_KEY = "chat_sid"
+
+
+def encode_state(state):
+    """
+    Compact record: values in STATE_KEYS order, trailing empties dropped.
+    {"booking_state": "await_date", "procedure": "Filling", "duration_minutes": 30}
+    -> '["await_date","Filling",30]'
+    """
+    values = [state.get(k) for k in STATE_KEYS]
+    while values and values[-1] is None:
+        values.pop()
+    return json.dumps(values, separators=(",", ":"))
+
+
+def decode_state(record):
+    return {
+        k: v for k, v in zip(STATE_KEYS, json.loads(record)) if v is not None
+    }
+
+
+# -----------------------------
+# Stores
+# -----------------------------
+class MemoryConversationStore:
+    """
+    Per-process store with sliding TTL and LRU eviction.
+    Fine for a single worker; use SQLiteConversationStore (or any object
+    with load/save/delete) when several workers serve the chat.
+    """
+
+    def __init__(self, ttl_seconds=1800, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        with self._lock:
+            entry = self._data.get(sid)
+            if entry is None:
+                return {}
+            expires_at, record = entry
+            if expires_at < time.monotonic():
+                del self._data[sid]
+                return {}
+            self._data.move_to_end(sid)
+        return decode_state(record)
+
+    def save(self, sid, state):
+        record = encode_state(state)
+        with self._lock:
+            self._data[sid] = (time.monotonic() + self.ttl_seconds, record)
+            self._data.move_to_end(sid)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+
+class SQLiteConversationStore:
+    """
+    Store shared by every worker on the host: one small table in its own
+    SQLite file (WAL mode), one connection per thread. Expired rows are
+    skipped on read and purged every `purge_every` writes.
+    """
+
+    def __init__(self, path, ttl_seconds=1800, purge_every=500):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            " sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid):
+        row = self._conn().execute(
+            "SELECT data FROM conversations WHERE sid = ? AND expires_at > ?",
+            (sid, time.time())
+        ).fetchone()
+        return decode_state(row[0]) if row else {}
+
+    def save(self, sid, state):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO conversations (sid, data, expires_at) VALUES (?, ?, ?)",
+            (sid, encode_state(state), time.time() + self.ttl_seconds)
+        )
+
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            conn.execute("DELETE FROM conversations WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+
+    def delete(self, sid):
+        conn = self._conn()
+        conn.execute("DELETE FROM conversations WHERE sid = ?", (sid,))
+        conn.commit()
+
+
+def create_store(url, ttl_seconds=1800):
+    """
+    "sqlite:///path/to/file.db" (shared by the host's workers) or "memory"
+    (single worker only)
+    """
+    if url.startswith("sqlite:///"):
+        return SQLiteConversationStore(url[len("sqlite:///"):], ttl_seconds)
+    if url == "memory":
+        return MemoryConversationStore(ttl_seconds)
+    raise ValueError(f"Unknown conversation store: {url}")
+
+
+# -----------------------------
+# Session adapter
+# -----------------------------
+class ConversationState(MutableMapping):
+    """
+    Dict-like view handed to medbot_reply in place of the Flask session:
+    STATE_KEYS live in the store, every other key (user_id, role, ...)
+    is read from and written to the cookie session as before.
+    Saved on exit only if the booking state changed.
+    """
+
+    def __init__(self, store, session):
+        self.store = store
+        self.session = session
+
+        sid = session.get(SESSION_ID_KEY)
+        if not sid:
+            sid = secrets.token_urlsafe(16)
+            session[SESSION_ID_KEY] = sid
+        self.sid = sid
+
+        self._state = store.load(sid)
+        self._dirty = False
+
+    def __getitem__(self, key):
+        if key in STATE_KEYS:
+            return self._state[key]
+        return self.session[key]
+
+    def __setitem__(self, key, value):
+        if key in STATE_KEYS:
+            if self._state.get(key) != value:
+                self._state[key] = value
+                self._dirty = True
+        else:
+            self.session[key] = value
+
+    def __delitem__(self, key):
+        if key in STATE_KEYS:
+            del self._state[key]
+            self._dirty = True
+        else:
+            del self.session[key]
+
+    def __iter__(self):
+        yield from self._state
+        yield from (k for k in self.session if k not in STATE_KEYS)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and self._dirty:
+            if self._state:
+                self.store.save(self.sid, self._state)
+            else:
+                self.store.delete(self.sid)
+        return False
@@ -0,0 +1,187 @@
+# utils/dashboard_summary.py
+
+import threading
+import time
+from datetime import date
+from types import SimpleNamespace
+
+from utils.events import appointment_changed
+from utils.queries import doctor_dashboard_data
+
+UPCOMING_LIMIT = 5
+RECONCILE_SECONDS = 300
+
+
+def _row(appointment):
+    """
+    Detached, read-only copy of what the dashboard template shows.
+    """
+    patient = appointment.patient
+    return SimpleNamespace(
+        id=appointment.id,
+        appointment_date=appointment.appointment_date,
+        appointment_time=appointment.appointment_time,
+        status=appointment.status,
+        reason=appointment.reason,
+        procedure=appointment.procedure,
+        created_at=appointment.created_at,
+        patient=SimpleNamespace(
+            name=patient.name if patient else None,
+            username=getattr(patient, "username", None) if patient else None
+        ),
+        patient_name=patient.name if patient else "Unknown",
+    )
+
+
+def _upsert(rows, row):
+    for i, existing in enumerate(rows):
+        if existing.id == row.id:
+            rows[i] = row
+            return
+    rows.append(row)
+
+
+class DashboardSummary:
+    """
+    Materialized doctor dashboard for the current day, kept in memory:
+    - appointments (today), upcoming_appointments (next few), emergencies
+    - counts of today's appointments by status, open emergencies
+    Write paths update it incrementally through the appointment_changed
+    signal; reconcile() rebuilds it from the appointments table on day
+    rollover and every RECONCILE_SECONDS (which also picks up changes made
+    by other worker processes).
+    """
+
+    def __init__(self, upcoming_limit=UPCOMING_LIMIT, reconcile_seconds=RECONCILE_SECONDS):
+        self.upcoming_limit = upcoming_limit
+        self.reconcile_seconds = reconcile_seconds
+
+        self._day = None
+        self._built_at = 0.0
+        self._today = []
+        self._upcoming = []
+        self._emergencies = []
+        self._lock = threading.RLock()
+
+        # apply() calls made while a rebuild is querying, replayed onto its
+        # result so they aren't lost when the lists are swapped in
+        self._generation = 0
+        self._rebuilds = 0
+        self._journal = []
+
+    # -----------------------------
+    # Full rebuild
+    # -----------------------------
+    def reconcile(self, today=None):
+        """
+        Rebuilds the lists from the appointments table. The queries run
+        without the lock; it is only taken to swap the new lists in.
+        """
+        today = today or date.today()
+        with self._lock:
+            self._rebuilds += 1
+            started_at = self._generation
+
+        try:
+            data = doctor_dashboard_data(today, self.upcoming_limit)
+            appointments = [_row(a) for a in data["appointments"]]
+            upcoming = [_row(a) for a in data["upcoming_appointments"]]
+            emergencies = [_row(a) for a in data["emergencies"]]
+        except BaseException:
+            with self._lock:
+                self._finish_rebuild()
+            raise
+
+        with self._lock:
+            self._day = today
+            self._today = appointments
+            self._upcoming = upcoming
+            self._emergencies = emergencies
+            self._built_at = time.monotonic()
+
+            # the queries may or may not have seen these; replaying is
+            # idempotent
+            for generation, row, old_status in self._journal:
+                if generation > started_at:
+                    self._apply_row(row, old_status)
+            self._finish_rebuild()
+
+    def _finish_rebuild(self):
+        self._rebuilds -= 1
+        if not self._rebuilds:
+            self._journal = []
+
+    def _is_stale(self, today):
+        return (
+            self._day != today
+            or time.monotonic() - self._built_at > self.reconcile_seconds
+        )
+
+    # -----------------------------
+    # Incremental update
+    # -----------------------------
+    def apply(self, appointment, old_status=None):
+        if self._day is None and not self._rebuilds:
+            return   # nothing built yet; the first get() reconciles
+
+        # built outside the lock: it may lazy-load appointment.patient
+        row = _row(appointment)
+
+        with self._lock:
+            self._generation += 1
+            if self._rebuilds:
+                self._journal.append((self._generation, row, old_status))
+            if self._day is not None:
+                self._apply_row(row, old_status)
+
+    def _apply_row(self, row, old_status):
+        if row.appointment_date == self._day:
+            _upsert(self._today, row)
+            self._today.sort(key=lambda r: r.appointment_time)
+
+        elif row.appointment_date > self._day:
+            _upsert(self._upcoming, row)
+            self._upcoming.sort(key=lambda r: (r.appointment_date, r.appointment_time))
+            del self._upcoming[self.upcoming_limit:]
+
+        if row.status == "Emergency":
+            self._emergencies = [e for e in self._emergencies if e.id != row.id]
+            self._emergencies.insert(0, row)
+        elif old_status == "Emergency":
+            self._emergencies = [e for e in self._emergencies if e.id != row.id]
+
+    # -----------------------------
+    # Read
+    # -----------------------------
+    def get(self, today=None):
+        """
+        Template context for doctor_dashboard.html, from memory.
+        """
+        today = today or date.today()
+        with self._lock:
+            # one rebuild at a time; meanwhile today's lists are served as is
+            stale = self._is_stale(today) and (self._day != today or not self._rebuilds)
+        if stale:
+            self.reconcile(today)
+
+        with self._lock:
+            counts = {}
+            for row in self._today:
+                counts[row.status] = counts.get(row.status, 0) + 1
+
+            return {
+                "appointments": list(self._today),
+                "upcoming_appointments": list(self._upcoming),
+                "emergencies": list(self._emergencies),
+                "counts": counts,
+                "open_emergencies": len(self._emergencies),
+            }
+
+
+dashboard_summary = DashboardSummary()
+
+
+@appointment_changed.connect
+def update_dashboard_summary(appointment, old_status=None):
+    dashboard_summary.apply(appointment, old_status)
+
@@ -0,0 +1,69 @@
+# utils/database.py
+
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_DATABASE_URI = "sqlite:///clinic.db"
+
+
+def database_uri():
+    """
+    DATABASE_URI from the environment, default SQLite file in instance/.
+    Accepts the "postgres://" scheme some hosts (Heroku) still hand out.
+    """
+    uri = os.getenv("DATABASE_URI") or os.getenv("DATABASE_URL") or DEFAULT_DATABASE_URI
+    if uri.startswith("postgres://"):
+        uri = "postgresql://" + uri[len("postgres://"):]
+    return uri
+
+
+def engine_options(uri):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for `uri`:
+    - SQLite: wait on the file lock (busy timeout) instead of failing with
+      "database is locked"; connections are cheap, no pool tuning needed
+    - server databases: bounded pool per worker, pre-ping so connections
+      dropped by the server/proxy are replaced, periodic recycle
+    """
+    if uri.startswith("sqlite"):
+        return {
+            "connect_args": {"timeout": sqlite_busy_timeout() / 1000}
+        }
+
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 10)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": True
+    }
+
+
+def sqlite_busy_timeout():
+    return int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+
+# -----------------------------
+# SQLite tuning (every new connection)
+# -----------------------------
+@event.listens_for(Engine, "connect")
+def tune_sqlite_connection(dbapi_connection, connection_record):
+    """
+    WAL lets readers run while one worker writes; synchronous=NORMAL is
+    safe with WAL and avoids an fsync per commit; busy_timeout makes
+    writers queue for the lock. journal_mode is persistent in the file,
+    the rest is per connection.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={sqlite_busy_timeout()}")
+    finally:
+        cursor.close()
@@ -0,0 +1,138 @@
+# utils/day_schedule.py
+
+from bisect import bisect_left, bisect_right
+from datetime import time as dtime
+from functools import lru_cache
+
+
+# -----------------------------
+# Minute helpers
+# -----------------------------
+def to_minutes(value):
+    """
+    Converts a datetime.time or "HH:MM" string into minutes after midnight.
+    """
+    if isinstance(value, dtime):
+        return value.hour * 60 + value.minute
+    hours, minutes = value.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def format_minutes(minutes):
+    """
+    Minutes after midnight -> "HH:MM".
+    """
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+# -----------------------------
+# Candidate grids
+# -----------------------------
+@lru_cache(maxsize=1024)
+def candidate_grid(windows, step_minutes, duration_minutes):
+    """
+    Every start minute on the step grid of each window where a block of
+    `duration_minutes` fits, ignoring bookings. Cached per
+    (windows, step, duration): a clinic has a handful of day templates and
+    procedure lengths, so each grid is built once per process.
+    """
+    grid = []
+    for w_start, w_end in windows:
+        grid.extend(range(w_start, w_end - duration_minutes + 1, step_minutes))
+    return tuple(grid)
+
+
+# -----------------------------
+# Day occupancy
+# -----------------------------
+class DaySchedule:
+    """
+    Occupancy of a single working day in integer minutes:
+    - `windows`: sorted (start, end) intervals the clinic is open
+    - busy blocks are kept as a sorted, merged interval list
+    - free start times are found in one sweep over windows + busy blocks
+    """
+
+    def __init__(self, windows, step_minutes=15):
+        self.windows = tuple(sorted(windows))
+        self.step_minutes = step_minutes
+        self._starts = []
+        self._ends = []
+
+    # -----------------------------
+    # Building the busy list
+    # -----------------------------
+    def load(self, blocks):
+        """
+        Replaces the busy list with `blocks` ((start, end) minute pairs).
+        Sorting + merging once is cheaper than inserting one by one.
+        """
+        starts, ends = [], []
+        for start, end in sorted(blocks):
+            if end <= start:
+                continue
+            if ends and start <= ends[-1]:
+                if end > ends[-1]:
+                    ends[-1] = end
+                continue
+            starts.append(start)
+            ends.append(end)
+
+        self._starts = starts
+        self._ends = ends
+        return self
+
+    @property
+    def busy(self):
+        return list(zip(self._starts, self._ends))
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def is_free(self, start, duration_minutes):
+        """
+        True if [start, start + duration) sits inside one open window and
+        does not touch any busy block.
+        """
+        end = start + duration_minutes
+
+        if not any(w_start <= start and end <= w_end for w_start, w_end in self.windows):
+            return False
+
+        # first busy block that ends after `start`
+        i = bisect_right(self._ends, start)
+        return i == len(self._starts) or self._starts[i] >= end
+
+    def free_starts(self, duration_minutes):
+        """
+        All start minutes (on the step grid of each window) where a block of
+        `duration_minutes` fits. Candidates come from the cached grid; grid
+        and busy blocks are both sorted, so one forward pointer over the
+        busy list plus a bisect past each blocking block is enough.
+        """
+        grid = candidate_grid(self.windows, self.step_minutes, duration_minutes)
+        starts, ends = self._starts, self._ends
+        if not starts:
+            return list(grid)
+
+        n = len(starts)
+        total = len(grid)
+        i = j = 0
+        result = []
+
+        while i < total:
+            current = grid[i]
+
+            # skip busy blocks that finished before this candidate
+            while j < n and ends[j] <= current:
+                j += 1
+
+            if j < n and starts[j] < current + duration_minutes:
+                # jump to the first candidate at or after the block end
+                i = bisect_left(grid, ends[j], i + 1)
+                continue
+
+            result.append(current)
+            i += 1
+
+        return result
@@ -0,0 +1,65 @@
+# utils/doctor_schedules.py
+
+from collections import namedtuple
+
+from models import db, User, DoctorSchedule
+from utils.day_schedule import to_minutes
+
+
+# -----------------------------
+# Working hours (integer minutes)
+# -----------------------------
+class DoctorHours(namedtuple("DoctorHours", "start lunch_start lunch_end end step_minutes")):
+    """
+    One doctor's working day in minutes after midnight. `lunch_start` /
+    `lunch_end` are None when the doctor works straight through.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def parse(cls, start_time, lunch_start, lunch_end, end_time, step_minutes=15):
+        """
+        Builds hours from "HH:MM" strings or datetime.time values.
+        """
+        has_lunch = lunch_start is not None and lunch_end is not None
+        return cls(
+            to_minutes(start_time),
+            to_minutes(lunch_start) if has_lunch else None,
+            to_minutes(lunch_end) if has_lunch else None,
+            to_minutes(end_time),
+            step_minutes or 15
+        )
+
+    @property
+    def windows(self):
+        if self.lunch_start is None:
+            return ((self.start, self.end),)
+        return ((self.start, self.lunch_start), (self.lunch_end, self.end))
+
+
+def load_doctor_hours(default_hours):
+    """
+    {doctor_id: DoctorHours} for every doctor, ordered by id, in one query.
+    Doctors without a DoctorSchedule row get `default_hours`.
+    """
+    rows = db.session.query(
+        User.id,
+        DoctorSchedule.start_time,
+        DoctorSchedule.lunch_start,
+        DoctorSchedule.lunch_end,
+        DoctorSchedule.end_time,
+        DoctorSchedule.step_minutes
+    ).outerjoin(
+        DoctorSchedule, DoctorSchedule.doctor_id == User.id
+    ).filter(
+        User.role == "doctor"
+    ).order_by(User.id).all()
+
+    hours = {}
+    for doctor_id, start, lunch_start, lunch_end, end, step in rows:
+        if start is None or end is None:
+            hours[doctor_id] = default_hours
+        else:
+            hours[doctor_id] = DoctorHours.parse(start, lunch_start, lunch_end, end, step)
+    return hours
@@ -0,0 +1,24 @@
+# utils/events.py
+
+from blinker import Namespace
+
+signals = Namespace()
+
+appointment_changed = signals.signal("appointment-changed", doc="""
+Sent after an appointment is committed: created (old_status=None) or
+its status changed. Receivers get the appointment as sender and the
+previous status as `old_status`.
+""")
+
+
+def notify_appointment_changed(appointment, old_status=None):
+    """
+    Call right after db.session.commit() in every write path.
+    A failing receiver is logged and doesn't stop the others: the
+    appointment is already saved.
+    """
+    for receiver in appointment_changed.receivers_for(appointment):
+        try:
+            receiver(appointment, old_status=old_status)
+        except Exception as e:
+            print(f"⚠️ appointment_changed receiver {receiver.__name__} failed: {e}")
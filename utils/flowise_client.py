@@ -0,0 +1,471 @@
+# utils/flowise_client.py
+
+import asyncio
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx   # optional: real non-blocking I/O for AsyncFlowiseClient
+except ImportError:
+    httpx = None
+
+
+class FlowiseUnavailable(Exception):
+    """
+    Flowise could not answer (down, slow, busy or circuit open).
+    Callers should fall back to the local bot logic.
+    """
+
+
+# -----------------------------
+# Payload parsing
+# -----------------------------
+def parse_payload(flowise_data):
+    """
+    Flowise output -> {"reply": ..., "handoff": ...}
+    Expected:
+    {
+      reply: "...",
+      handoff: "none | booking | availability | status"
+    }
+    either as `json` or as a JSON string in `text`.
+    """
+    try:
+        payload = (
+            flowise_data.get("json")
+            or json.loads(flowise_data.get("text", "{}"))
+        )
+    except Exception:
+        payload = {}
+
+    if not isinstance(payload, dict):
+        payload = {}
+    return payload
+
+
+def _sse_events(response):
+    """
+    (event, data) pairs from a Flowise prediction stream, where each
+    message is `data: {"event": "token", "data": "..."}`.
+    """
+    response.encoding = "utf-8"
+    # chunk_size=None: hand over lines as they arrive, no read-ahead buffer
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        try:
+            message = json.loads(line[5:].strip())
+        except ValueError:
+            continue
+        if isinstance(message, dict):
+            yield message.get("event"), message.get("data")
+
+
+class ReplyStreamParser:
+    """
+    Incremental reader for a streamed chatflow answer. The LLM writes the
+    same JSON object parse_payload expects, token by token; feed() returns
+    the newly decoded part of the "reply" string as soon as it arrives, so
+    it can be shown before the object (and its handoff) is complete.
+    An answer that doesn't start with "{" is passed through as plain text.
+    """
+
+    REPLY_START = re.compile(r'"reply"\s*:\s*"')
+    ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b",
+               "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self):
+        self.text = ""
+        self.reply = ""
+        self._plain = None    # unknown until the first non-blank char
+        self._pos = None      # scan position inside the reply string
+        self._closed = False
+
+    def feed(self, chunk):
+        self.text += chunk
+
+        if self._plain is None:
+            head = self.text.lstrip()
+            if not head:
+                return ""
+            self._plain = head[0] not in "{`"
+
+        if self._plain:
+            delta = self.text[len(self.reply):]
+            self.reply = self.text
+            return delta
+
+        if self._closed:
+            return ""
+
+        if self._pos is None:
+            match = self.REPLY_START.search(self.text)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        return self._decode()
+
+    def _decode(self):
+        text, pos, out = self.text, self._pos, []
+
+        while pos < len(text):
+            c = text[pos]
+            if c == '"':
+                self._closed = True
+                pos += 1
+                break
+            if c != "\\":
+                out.append(c)
+                pos += 1
+                continue
+
+            # Escape sequence: wait until it's complete
+            if pos + 1 >= len(text):
+                break
+            code = text[pos + 1]
+            if code == "u":
+                # \uXXXX, or a \uXXXX\uXXXX surrogate pair (emoji)
+                if pos + 6 > len(text):
+                    break
+                size = 12 if "d800" <= text[pos + 2:pos + 6].lower() < "dc00" else 6
+                if pos + size > len(text):
+                    break
+                try:
+                    out.append(json.loads(f'"{text[pos:pos + size]}"'))
+                except ValueError:
+                    pass
+                pos += size
+            else:
+                out.append(self.ESCAPES.get(code, code))
+                pos += 2
+
+        self._pos = pos
+        delta = "".join(out)
+        self.reply += delta
+        return delta
+
+    def payload(self):
+        """
+        Final {"reply", "handoff"} payload, parsed from the whole answer.
+        """
+        payload = parse_payload({"text": self.text.strip().strip("`").removeprefix("json")})
+        if "reply" not in payload and self.reply:
+            payload["reply"] = self.reply.strip()
+        return payload
+
+
+# -----------------------------
+# Circuit breaker
+# -----------------------------
+class CircuitBreaker:
+    """
+    - closed: calls go through; errors and slow calls are counted
+    - open: after `failure_threshold` consecutive failures, calls are
+      rejected for `reset_seconds`
+    - half-open: one trial call decides whether to close or re-open
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30, slow_call_seconds=8):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.slow_call_seconds = slow_call_seconds
+
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def cancel(self):
+        """
+        The allowed call never reached Flowise (e.g. no free slot):
+        frees the half-open trial without counting a result.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record(self, ok, duration=0.0):
+        """
+        Records a finished call; a call slower than `slow_call_seconds`
+        counts as a failure even if it succeeded.
+        """
+        failed = not ok or duration > self.slow_call_seconds
+
+        with self._lock:
+            self._trial_running = False
+            if not failed:
+                self._failures = 0
+                self._opened_at = None
+                return
+
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+# -----------------------------
+# Sync client
+# -----------------------------
+class FlowiseClient:
+    """
+    Flowise prediction client for WSGI workers:
+    - one pooled requests.Session (keep-alive, no per-message handshake)
+    - at most `max_concurrency` calls in flight; extra callers wait up to
+      `queue_timeout` seconds, then fail fast instead of pinning a worker
+    - circuit breaker short-circuits while Flowise is slow or down
+    """
+
+    def __init__(self, url, api_key=None, timeout=12, connect_timeout=3,
+                 max_concurrency=8, queue_timeout=0.5, breaker=None):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = (connect_timeout, timeout)
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker(slow_call_seconds=timeout * 0.75)
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max_concurrency,
+            max_retries=0
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        if api_key:
+            self._session.headers["Authorization"] = f"Bearer {api_key}"
+
+    @property
+    def enabled(self):
+        return bool(self.url) and self.url.startswith(("http://", "https://"))
+
+    def predict(self, question):
+        """
+        Raw Flowise JSON for `question`. Raises FlowiseUnavailable.
+        """
+        if not self.enabled:
+            raise FlowiseUnavailable("Flowise is not configured")
+
+        if not self.breaker.allow():
+            raise FlowiseUnavailable("Flowise circuit is open")
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.breaker.cancel()
+            raise FlowiseUnavailable("Too many Flowise calls in flight")
+
+        started = time.monotonic()
+        try:
+            res = self._session.post(
+                self.url,
+                json={"question": question},
+                timeout=self.timeout
+            )
+            res.raise_for_status()
+            data = res.json()
+        except Exception as e:
+            self.breaker.record(False)
+            raise FlowiseUnavailable(str(e)) from e
+        finally:
+            self._slots.release()
+
+        self.breaker.record(True, time.monotonic() - started)
+        return data
+
+    def ask(self, question):
+        """
+        Parsed {"reply", "handoff"} payload for `question`.
+        """
+        return parse_payload(self.predict(question))
+
+    def stream(self, question):
+        """
+        Yields answer text chunks for `question` as Flowise streams them
+        (prediction API with "streaming": true, server-sent events).
+        A chatflow that doesn't stream answers with plain JSON, which is
+        yielded as a single chunk. Raises FlowiseUnavailable, also midway.
+
+        The concurrency slot is held until the stream is consumed or
+        closed; time to first chunk is what the breaker counts as latency.
+        """
+        if not self.enabled:
+            raise FlowiseUnavailable("Flowise is not configured")
+
+        if not self.breaker.allow():
+            raise FlowiseUnavailable("Flowise circuit is open")
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.breaker.cancel()
+            raise FlowiseUnavailable("Too many Flowise calls in flight")
+
+        started = time.monotonic()
+        first_chunk = None
+        res = None
+        try:
+            res = self._session.post(
+                self.url,
+                json={"question": question, "streaming": True},
+                timeout=self.timeout,
+                stream=True
+            )
+            res.raise_for_status()
+
+            if not res.headers.get("Content-Type", "").startswith("text/event-stream"):
+                data = res.json()
+                first_chunk = time.monotonic() - started
+                yield data.get("text") or json.dumps(data.get("json") or {})
+                return
+
+            for event, data in _sse_events(res):
+                if event == "token" and data:
+                    if first_chunk is None:
+                        first_chunk = time.monotonic() - started
+                    yield data
+                elif event == "error":
+                    raise FlowiseUnavailable(f"Flowise stream error: {data}")
+                elif event == "end":
+                    break
+
+        except GeneratorExit:
+            # Caller went away (browser closed): not Flowise's fault
+            self.breaker.cancel()
+            raise
+        except FlowiseUnavailable:
+            self.breaker.record(False)
+            raise
+        except Exception as e:
+            self.breaker.record(False)
+            raise FlowiseUnavailable(str(e)) from e
+        else:
+            self.breaker.record(True, first_chunk or 0.0)
+        finally:
+            if res is not None:
+                res.close()
+            self._slots.release()
+
+    def close(self):
+        self._session.close()
+
+
+# -----------------------------
+# Async client
+# -----------------------------
+class AsyncFlowiseClient:
+    """
+    asyncio counterpart of FlowiseClient with the same limits and breaker.
+    Uses httpx.AsyncClient when httpx is installed; otherwise runs the
+    pooled sync client on its own pool of `max_concurrency` threads (the
+    default asyncio pool is sized by CPU count, far below that).
+    """
+
+    def __init__(self, url, api_key=None, timeout=12, connect_timeout=3,
+                 max_concurrency=64, queue_timeout=0.5, breaker=None):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker(slow_call_seconds=timeout * 0.75)
+
+        self._slots = None    # created lazily, inside the running loop
+        self._client = None
+        self._sync = None
+        self._executor = None
+
+    @property
+    def enabled(self):
+        return bool(self.url) and self.url.startswith(("http://", "https://"))
+
+    def _ensure_ready(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        if httpx is not None and self._client is None:
+            headers = {}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self._client = httpx.AsyncClient(
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.max_concurrency)
+            )
+        elif httpx is None and self._sync is None:
+            self._sync = FlowiseClient(
+                self.url, self.api_key, self.timeout, self.connect_timeout,
+                max_concurrency=self.max_concurrency,
+                breaker=CircuitBreaker(failure_threshold=10 ** 9)
+            )
+            self._executor = ThreadPoolExecutor(
+                self.max_concurrency, thread_name_prefix="flowise"
+            )
+
+    async def predict(self, question):
+        if not self.enabled:
+            raise FlowiseUnavailable("Flowise is not configured")
+
+        if not self.breaker.allow():
+            raise FlowiseUnavailable("Flowise circuit is open")
+
+        self._ensure_ready()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.breaker.cancel()
+            raise FlowiseUnavailable("Too many Flowise calls in flight")
+
+        started = time.monotonic()
+        try:
+            if self._client is not None:
+                res = await self._client.post(self.url, json={"question": question})
+                res.raise_for_status()
+                data = res.json()
+            else:
+                data = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._sync.predict, question
+                )
+        except Exception as e:
+            self.breaker.record(False)
+            raise FlowiseUnavailable(str(e)) from e
+        finally:
+            self._slots.release()
+
+        self.breaker.record(True, time.monotonic() - started)
+        return data
+
+    async def ask(self, question):
+        return parse_payload(await self.predict(question))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+        if self._sync is not None:
+            self._sync.close()
+            self._executor.shutdown(wait=False)
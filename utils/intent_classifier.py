@@ -0,0 +1,133 @@
+# utils/intent_classifier.py
+
+import re
+
+# -------------------------------
+# Intent patterns
+# -------------------------------
+# strong: the message clearly asks for this intent
+# weak:   a hint only, never enough to skip Flowise on its own
+INTENT_PATTERNS = {
+    "greeting": {
+        "strong": [
+            r"^(hi+|hello|hey+|namaste|good (morning|afternoon|evening))"
+            r"( there| medbot)?[\s!.🙂😊👋]*$",
+        ],
+        "weak": [],
+    },
+    "help": {
+        "strong": [
+            r"\bhelp\b",
+            r"\bwhat can you do\b",
+            r"\bhow (do|does) (this|it) work\b",
+        ],
+        "weak": [],
+    },
+    "status": {
+        "strong": [
+            r"\b(appointment|booking) status\b",
+            r"\bstatus of my (appointment|booking)\b",
+            r"\bmy (appointment|booking)s?\b.*\b(status|approved|confirmed|pending|rejected)\b",
+            r"\b(when|what time) is my (appointment|booking)\b",
+            r"\bcheck my (appointment|booking)\b",
+        ],
+        "weak": [r"\bstatus\b"],
+    },
+    "clinic_info": {
+        "strong": [
+            r"\b(timings?|opening hours|working hours|clinic hours)\b",
+            r"\b(when|what time) (are you|is the clinic) open\b",
+            r"\b(what|which) services\b",
+            r"\bservices (do you|you) (offer|provide)\b",
+            r"\b(which|who is the) doctor\b",
+        ],
+        "weak": [r"\bservices?\b", r"\bopen\b"],
+    },
+    "book": {
+        "strong": [
+            r"\bbook\b",
+            r"\bschedule\b",
+            r"\b(make|get|fix|need|want) an? appointment\b",
+        ],
+        "weak": [],
+    },
+}
+
+# When both match, the left intent is the more specific reading
+# ("is my appointment approved" mentions an appointment but asks for status)
+OVERRIDES = {"status": {"book"}}
+
+# Tie-break order when two unrelated intents match equally
+PRIORITY = ["status", "book", "clinic_info", "help", "greeting"]
+
+STRONG, WEAK = 0.95, 0.6
+LONG_MESSAGE_WORDS = 12
+
+
+def _alternation(patterns):
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in patterns))
+
+
+class IntentClassifier:
+    """
+    Local pre-classifier run before Flowise:
+    - one compiled alternation per intent and strength
+    - book keywords come from TREATMENTS (+ the booking safety-net words)
+    - only intents that have replies in clinic_responses.json are enabled
+    classify() returns (intent, confidence); (None, 0.0) when nothing matched.
+    """
+
+    def __init__(self, treatments, response_keys, booking_keywords=()):
+        response_keys = set(response_keys)
+        treatment_words = [k for keys, _, _ in treatments for k in keys]
+
+        self._matchers = {}
+        for intent, patterns in INTENT_PATTERNS.items():
+            strong = list(patterns["strong"])
+            weak = list(patterns["weak"])
+
+            if intent == "book":
+                strong += [rf"\b{re.escape(k)}\b" for k in booking_keywords]
+                weak += [rf"\b{re.escape(k)}\b" for k in treatment_words]
+            elif not any(key == intent or key.startswith(intent + "_")
+                         for key in response_keys):
+                continue
+
+            self._matchers[intent] = (_alternation(strong), _alternation(weak))
+
+    def scores(self, text):
+        text = " ".join(text.lower().split())
+        found = {}
+        for intent, (strong, weak) in self._matchers.items():
+            if strong and strong.search(text):
+                found[intent] = STRONG
+            elif weak and weak.search(text):
+                found[intent] = WEAK
+
+        for specific, generals in OVERRIDES.items():
+            if specific not in found:
+                continue
+            for general in generals:
+                if found.get(general, 0) <= found[specific]:
+                    found.pop(general, None)
+        return found
+
+    def classify(self, text):
+        found = self.scores(text)
+        if not found:
+            return None, 0.0
+
+        best = max(found.values())
+        top = [i for i in PRIORITY if found.get(i) == best]
+        intent = top[0]
+
+        confidence = best
+        if len(top) > 1:
+            # two readings are equally likely: let the LLM decide
+            confidence = min(confidence, 0.5)
+        if len(text.split()) > LONG_MESSAGE_WORDS:
+            confidence *= 0.8
+
+        return intent, round(confidence, 2)
@@ -0,0 +1,132 @@
+# utils/keyword_matcher.py
+
+import re
+
+MIN_FUZZY_LENGTH = 6   # shorter keywords ("rct", "book", "fill") must match exactly
+
+# Ordinary words one edit away from a keyword: never typos ("falling" is
+# not "filling", "clearing" is not "cleaning")
+NOT_TYPOS = frozenset([
+    "falling", "felling", "filing", "fitting", "clearing", "gleaning",
+    "scaring", "scalding", "scalping", "spelling", "smelling", "breeding",
+    "bleeping", "earnest",
+])
+
+
+def _trie_regex(keys):
+    """
+    Regex matching any of `keys`, factored as a prefix trie
+    ("cleaning|cavity" -> "c(?:leaning|avity)") so matching cost grows
+    with the message length, not with the number of keywords.
+    Spaces inside keys match any whitespace; longer keys win.
+    """
+    trie = {}
+    for key in keys:
+        node = trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        branches = [
+            (r"\s+" if ch == " " else re.escape(ch)) + build(child)
+            for ch, child in sorted(node.items()) if ch != ""
+        ]
+        if not branches:
+            return ""
+        ends_here = "" in node
+        if len(branches) == 1 and not ends_here:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if ends_here else "")
+
+    return build(trie)
+
+
+def _deletes(word):
+    """
+    Every string obtained by deleting one character of `word`.
+    """
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class KeywordMatcher:
+    """
+    Matches many keywords against a message in one pass:
+    - all keywords compiled into a single trie-shaped regex, longest
+      first, anchored at a word start ("book" matches "booking", not
+      "facebook")
+    - multi-word keywords allow any whitespace between words
+    - typo tolerance: a word one edit away from a single-word keyword
+      (of MIN_FUZZY_LENGTH+ letters) matches it, via a precomputed
+      one-deletion index, so lookups don't depend on the catalog size.
+      The first letter must agree ("willing", "killing" aren't
+      "filling") and NOT_TYPOS words never match
+    - priority: entries earlier in the list win
+    """
+
+    def __init__(self, entries, fuzzy=True):
+        """
+        entries: [(keywords, value), ...] in priority order.
+        """
+        self._by_keyword = {}
+        for priority, (keywords, value) in enumerate(entries):
+            for keyword in keywords:
+                key = " ".join(keyword.lower().split())
+                if key and key not in self._by_keyword:
+                    self._by_keyword[key] = (priority, value)
+
+        self._pattern = None
+        if self._by_keyword:
+            self._pattern = re.compile(
+                rf"\b{_trie_regex(self._by_keyword)}", re.IGNORECASE
+            )
+
+        # one-deletion index: variant -> keywords it can come from
+        self._fuzzy = {}
+        if fuzzy:
+            for key in self._by_keyword:
+                if " " in key or len(key) < MIN_FUZZY_LENGTH:
+                    continue
+                for variant in _deletes(key) | {key}:
+                    self._fuzzy.setdefault(variant, set()).add(key)
+
+    # -----------------------------
+    # Matching
+    # -----------------------------
+    def _exact(self, text):
+        if self._pattern is None:
+            return []
+        return [
+            self._by_keyword[" ".join(m.group(0).lower().split())]
+            for m in self._pattern.finditer(text)
+        ]
+
+    def _typos(self, text):
+        found = []
+        for word in re.findall(r"[a-z]+", text.lower()):
+            if len(word) < MIN_FUZZY_LENGTH - 1 or word in NOT_TYPOS:
+                continue
+            keys = set(self._fuzzy.get(word, ()))
+            for variant in _deletes(word):
+                keys |= self._fuzzy.get(variant, set())
+            found.extend(self._by_keyword[k] for k in keys if k[0] == word[0])
+        return found
+
+    def find_all(self, text):
+        """
+        (priority, value) of every keyword found; typo matching only runs
+        when nothing matched exactly.
+        """
+        return self._exact(text) or (self._typos(text) if self._fuzzy else [])
+
+    def best(self, text):
+        """
+        Value of the highest-priority entry mentioned in `text`, or None.
+        """
+        found = self.find_all(text)
+        if not found:
+            return None
+        return min(found, key=lambda match: match[0])[1]
+
+    def matches(self, text):
+        return bool(self.find_all(text))
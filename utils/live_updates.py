@@ -0,0 +1,111 @@
+# utils/live_updates.py
+
+import json
+import queue
+import threading
+from collections import deque
+
+from utils.events import appointment_changed
+from utils.queries import appointment_to_dict
+
+HEARTBEAT_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 100
+REPLAY_SIZE = 200
+
+
+class EventBroker:
+    """
+    Fan-out of appointment deltas to connected dashboards (SSE).
+    - each subscriber gets its own bounded queue; a client that stops
+      reading is dropped instead of holding memory
+    - the last REPLAY_SIZE events are kept so a reconnecting EventSource
+      (Last-Event-ID) gets what it missed instead of reloading the page
+    In-process only: with several workers, each serves the dashboards
+    connected to it and the dashboard summary reconcile covers the rest.
+    """
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE, replay_size=REPLAY_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._recent = deque(maxlen=replay_size)
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def publish(self, event, data):
+        with self._lock:
+            message = (self._next_id, event, json.dumps(data))
+            self._next_id += 1
+            self._recent.append(message)
+            subscribers = list(self._subscribers)
+
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                self._drop(q)
+        return message[0]
+
+    def _drop(self, q):
+        """
+        Disconnects a subscriber that fell behind; its EventSource
+        reconnects and resumes from the replay buffer.
+        """
+        self.unsubscribe(q)
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+        q.put_nowait(None)
+
+    def subscribe(self, last_event_id=None):
+        q = queue.Queue(self.queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                for message in self._recent:
+                    if message[0] > last_event_id and not q.full():
+                        q.put_nowait(message)
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def stream(self, q, heartbeat=HEARTBEAT_SECONDS):
+        """
+        SSE body for one subscriber. Sends a comment line as heartbeat so
+        proxies keep the connection open and dead clients get noticed.
+        """
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+
+                if message is None:   # dropped for falling behind
+                    return
+
+                event_id, event, data = message
+                yield f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+        finally:
+            self.unsubscribe(q)
+
+
+broker = EventBroker()
+
+
+@appointment_changed.connect
+def publish_appointment_change(appointment, old_status=None):
+    data = appointment_to_dict(appointment)
+    data["old_status"] = old_status
+    data["reason"] = appointment.reason
+    broker.publish("appointment", data)
@@ -1,25 +1,246 @@
+import threading
+from datetime import datetime, timedelta
+
 from flask_mail import Message
-from flask import render_template
+from flask import render_template, current_app
+from sqlalchemy import func
+
+from models import db, EmailOutbox
+
+SENDER = ("MedBot Dental Clinic", "yourclinicmail@gmail.com")
+
+BATCH_SIZE = 20            # emails sent per SMTP connection
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 30       # 30s, 60s, 120s, 240s between attempts
+SEND_LEASE_SECONDS = 300   # a claimed email is retried after this if its worker died
+POLL_SECONDS = 5
+
 
 def send_email(to_email, subject, template_name, **kwargs):
     """
-    Sends an email using the given template inside templates/email_templates/
+    Renders the template inside templates/email_templates/ and queues the
+    email in the outbox. The outbox worker sends it in the background, so
+    the request never waits on SMTP.
     Example usage:
         send_email(user.email, "Appointment Approved", "appointment_approved.html",
                    name=user.name, date=..., time_slot=...)
+    Returns the outbox id (None if queueing failed).
     """
     try:
-        # Import mail only when function is called (lazy import)
-        from app import mail
-        
-        msg = Message(
-            subject=subject,
-            sender=("MedBot Dental Clinic", "yourclinicmail@gmail.com"),
-            recipients=[to_email]
-        )
         # Render HTML template with required variables
-        msg.html = render_template(f"email_templates/{template_name}", **kwargs)
-        mail.send(msg)
-        print(f"✅ Email sent to {to_email}")
+        html = render_template(f"email_templates/{template_name}", **kwargs)
+
+        item = EmailOutbox(to_email=to_email, subject=subject, html=html)
+        db.session.add(item)
+        db.session.commit()
+        print(f"📨 Email queued for {to_email}")
+
+        _wake_worker()
+        return item.id
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Email queueing failed: {e}")
+        return None
+
+
+# -----------------------------
+# Outbox processing
+# -----------------------------
+def _claim_batch(batch_size):
+    """
+    Marks up to `batch_size` due emails as 'sending' and returns them.
+    Each claim is a conditional UPDATE, so several workers (threads or
+    processes) never send the same email twice.
+
+    A claim counts as an attempt: an email whose lease expired (its worker
+    crashed or hung while sending it) is retried until MAX_ATTEMPTS, then
+    marked failed instead of being claimed forever.
+    """
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=SEND_LEASE_SECONDS)
+
+    EmailOutbox.query.filter(
+        EmailOutbox.status == "sending",
+        EmailOutbox.next_attempt_at <= now,
+        EmailOutbox.attempts >= MAX_ATTEMPTS
+    ).update(
+        {"status": "failed", "last_error": "Send lease expired (worker crashed or hung)"},
+        synchronize_session=False
+    )
+
+    claimable = (
+        EmailOutbox.status.in_(["queued", "sending"]),
+        EmailOutbox.next_attempt_at <= now
+    )
+
+    candidate_ids = [
+        row.id for row in db.session.query(EmailOutbox.id)
+        .filter(*claimable)
+        .order_by(EmailOutbox.id)
+        .limit(batch_size)
+    ]
+
+    claimed = []
+    for item_id in candidate_ids:
+        updated = EmailOutbox.query.filter(
+            EmailOutbox.id == item_id, *claimable
+        ).update(
+            {
+                "status": "sending",
+                "next_attempt_at": lease_until,
+                "attempts": func.coalesce(EmailOutbox.attempts, 0) + 1
+            },
+            synchronize_session=False
+        )
+        if updated:
+            claimed.append(item_id)
+    db.session.commit()
+
+    if not claimed:
+        return []
+    return EmailOutbox.query.filter(
+        EmailOutbox.id.in_(claimed)
+    ).order_by(EmailOutbox.id).all()
+
+
+def _record_failure(item, error):
+    # the attempt was already counted when the email was claimed
+    item.last_error = str(error)
+
+    if item.attempts >= MAX_ATTEMPTS:
+        item.status = "failed"
+        print(f"❌ Email to {item.to_email} failed permanently: {error}")
+        return
+
+    delay = BACKOFF_SECONDS * 2 ** (item.attempts - 1)
+    item.status = "queued"
+    item.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+    print(f"⚠️ Email to {item.to_email} failed, retrying in {delay}s: {error}")
+
+
+def process_outbox(batch_size=BATCH_SIZE):
+    """
+    Sends one batch of due emails over a single SMTP connection.
+    Needs an app context. Returns the number of emails sent.
+    """
+    items = _claim_batch(batch_size)
+    if not items:
+        return 0
+
+    sent = 0
+    mail = current_app.extensions["mail"]
+    try:
+        with mail.connect() as connection:
+            for item in items:
+                try:
+                    connection.send(Message(
+                        subject=item.subject,
+                        sender=SENDER,
+                        recipients=[item.to_email],
+                        html=item.html
+                    ))
+                    item.status = "sent"
+                    item.sent_at = datetime.utcnow()
+                    sent += 1
+                    print(f"✅ Email sent to {item.to_email}")
+                except Exception as e:
+                    _record_failure(item, e)
     except Exception as e:
-        print(f"❌ Email sending failed: {e}")
\ No newline at end of file
+        # Could not connect (or the connection dropped): retry the rest
+        for item in items:
+            if item.status == "sending":
+                _record_failure(item, e)
+
+    db.session.commit()
+    return sent
+
+
+def outbox_stats():
+    """
+    Email counts by status plus the queue depth (queued + sending).
+    """
+    counts = dict(
+        db.session.query(EmailOutbox.status, func.count(EmailOutbox.id))
+        .group_by(EmailOutbox.status)
+        .all()
+    )
+    counts["queue_depth"] = counts.get("queued", 0) + counts.get("sending", 0)
+    return counts
+
+
+# -----------------------------
+# Background worker
+# -----------------------------
+class OutboxWorker:
+    """
+    Sends outbox batches until the queue is empty, then sleeps until woken
+    by send_email() or POLL_SECONDS pass (retries become due).
+    """
+
+    def __init__(self, app, poll_seconds=POLL_SECONDS):
+        self.app = app
+        self.poll_seconds = poll_seconds
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.run, name="email-outbox", daemon=True
+        )
+        self._thread.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def run(self):
+        while not self._stopped.is_set():
+            with self.app.app_context():
+                try:
+                    while process_outbox():
+                        pass
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ Outbox worker error: {e}")
+                finally:
+                    db.session.remove()
+
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_outbox_worker(app):
+    """
+    Starts the in-process worker once. Set MAIL_OUTBOX_WORKER = "off" when
+    a separate `python -m utils.mailer` process sends the emails.
+    """
+    global _worker
+    if app.config.get("MAIL_OUTBOX_WORKER", "thread") != "thread":
+        return None
+
+    with _worker_lock:
+        if _worker is None:
+            _worker = OutboxWorker(app)
+            _worker.start()
+    return _worker
+
+
+def _wake_worker():
+    worker = _worker or start_outbox_worker(current_app._get_current_object())
+    if worker:
+        worker.wake()
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    print("📨 Email outbox worker running (Ctrl+C to stop)")
+    OutboxWorker(create_app()).run()
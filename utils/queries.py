@@ -0,0 +1,185 @@
+# utils/queries.py
+
+from datetime import datetime
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import joinedload, load_only
+
+from models import db, Appointment, User
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+# -----------------------------
+# Keyset cursors
+# -----------------------------
+def encode_cursor(appointment):
+    """
+    Position of a row in (date, time, id) order: "2025-01-31_14:30:00_42"
+    """
+    return "_".join([
+        appointment.appointment_date.isoformat(),
+        appointment.appointment_time.strftime("%H:%M:%S"),
+        str(appointment.id),
+    ])
+
+
+def decode_cursor(cursor):
+    """
+    Inverse of encode_cursor. Raises ValueError on a malformed cursor.
+    """
+    date_str, time_str, id_str = cursor.split("_")
+    return (
+        datetime.strptime(date_str, "%Y-%m-%d").date(),
+        datetime.strptime(time_str, "%H:%M:%S").time(),
+        int(id_str),
+    )
+
+
+# -----------------------------
+# Doctor appointment listing
+# -----------------------------
+def filter_appointments(query, filter_type, today):
+    if filter_type == 'today':
+        query = query.filter(Appointment.appointment_date == today)
+    elif filter_type == 'upcoming':
+        query = query.filter(Appointment.appointment_date > today)
+    elif filter_type == 'completed':
+        query = query.filter(Appointment.status == 'completed')
+    elif filter_type == 'cancelled':
+        query = query.filter(
+            Appointment.status.in_(['cancelled', 'rejected'])
+        )
+    return query
+
+
+def appointment_page(filter_type, today, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    One page of appointments, newest first, using keyset pagination:
+    the next page starts strictly after the cursor row in
+    (appointment_date, appointment_time, id) order, so the cost of a page
+    doesn't depend on how deep into the history it is. Patients are
+    joined in the same query.
+
+    Returns (appointments, next_cursor); next_cursor is None on the
+    last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    sort_key = tuple_(
+        Appointment.appointment_date,
+        Appointment.appointment_time,
+        Appointment.id
+    )
+
+    query = filter_appointments(Appointment.query, filter_type, today)
+
+    if cursor:
+        query = query.filter(sort_key < tuple_(*decode_cursor(cursor)))
+
+    rows = query.options(
+        joinedload(Appointment.patient).load_only(User.id, User.name)
+    ).order_by(
+        Appointment.appointment_date.desc(),
+        Appointment.appointment_time.desc(),
+        Appointment.id.desc()
+    ).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+def appointment_to_dict(appointment):
+    patient = appointment.patient
+    return {
+        "id": appointment.id,
+        "patient_id": appointment.patient_id,
+        "patient_name": patient.name if patient else None,
+        "date": appointment.appointment_date.isoformat(),
+        "time": appointment.appointment_time.strftime("%H:%M"),
+        "duration_minutes": appointment.duration_minutes,
+        "procedure": appointment.procedure,
+        "status": appointment.status,
+        "source": appointment.source,
+    }
+
+
+# -----------------------------
+# Dashboards
+# -----------------------------
+def _with_patient(*columns):
+    """
+    Loader option: patient joined into the same query, only `columns`.
+    """
+    return joinedload(Appointment.patient).load_only(User.id, *columns)
+
+
+def doctor_dashboard_data(today, upcoming_limit=5):
+    """
+    Everything doctor_dashboard.html renders, in three queries total
+    (today, upcoming, emergencies), patients included.
+    """
+    today_appointments = Appointment.query.options(
+        _with_patient(User.name, User.username)
+    ).filter(
+        Appointment.appointment_date == today
+    ).order_by(Appointment.appointment_time).all()
+
+    upcoming_appointments = Appointment.query.options(
+        _with_patient(User.name, User.username)
+    ).filter(
+        Appointment.appointment_date > today
+    ).order_by(
+        Appointment.appointment_date,
+        Appointment.appointment_time
+    ).limit(upcoming_limit).all()
+
+    emergencies = Appointment.query.options(
+        _with_patient(User.name, User.username)
+    ).filter_by(
+        status="Emergency"
+    ).order_by(Appointment.id.desc()).all()
+
+    return {
+        "appointments": today_appointments,
+        "upcoming_appointments": upcoming_appointments,
+        "emergencies": emergencies,
+    }
+
+
+def patient_appointments(patient_id):
+    """
+    Patient dashboard list, newest first, only the displayed columns.
+    """
+    return Appointment.query.options(
+        load_only(
+            Appointment.appointment_date,
+            Appointment.appointment_time,
+            Appointment.procedure,
+            Appointment.status
+        )
+    ).filter_by(
+        patient_id=patient_id
+    ).order_by(
+        Appointment.appointment_date.desc(),
+        Appointment.appointment_time.desc()
+    ).all()
+
+
+def latest_appointment(patient_id):
+    """
+    Most recent appointment as (date, time, procedure, status), or None.
+    """
+    return db.session.query(
+        Appointment.appointment_date,
+        Appointment.appointment_time,
+        Appointment.procedure,
+        Appointment.status
+    ).filter(
+        Appointment.patient_id == patient_id
+    ).order_by(
+        Appointment.appointment_date.desc(),
+        Appointment.appointment_time.desc()
+    ).first()
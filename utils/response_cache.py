@@ -0,0 +1,95 @@
+# utils/response_cache.py
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Words that don't change what an FAQ-style question is about
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "was", "be", "do", "does", "did",
+    "i", "me", "my", "you", "your", "we", "our", "it", "its",
+    "what", "whats", "please", "can", "could", "would", "tell", "about",
+    "to", "of", "for", "in", "on", "at", "and", "or", "hi", "hey", "hello",
+}
+
+_NON_WORD = re.compile(r"[^a-z0-9\s]+")
+
+
+def normalize_question(text, near_duplicates=True):
+    """
+    Cache key for a question:
+    - lowercase, punctuation dropped, whitespace collapsed
+    - with `near_duplicates`: stopwords dropped and words sorted, so
+      "What are your timings?" and "timings please" share an entry
+    """
+    words = _NON_WORD.sub(" ", text.lower()).split()
+
+    if near_duplicates:
+        content = sorted(set(w for w in words if w not in STOPWORDS))
+        if content:
+            return " ".join(content)
+
+    return " ".join(words)
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of Flowise replies keyed by normalized question.
+    Only plain answers (handoff == "none") belong here: anything that hands
+    off to the booking backend depends on per-user state.
+    """
+
+    def __init__(self, max_entries=500, ttl_seconds=3600, near_duplicates=True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.near_duplicates = near_duplicates
+
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, question):
+        return normalize_question(question, self.near_duplicates)
+
+    def get(self, question):
+        key = self._key(question)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, question, reply):
+        key = self._key(question)
+        if not key:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, reply)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._data)
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "size": size,
+        }
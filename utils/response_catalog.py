@@ -0,0 +1,166 @@
+# utils/response_catalog.py
+
+import json
+import os
+import random
+import re
+import threading
+import time
+
+PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+
+
+class _Values(dict):
+    """
+    format_map mapping that leaves unknown placeholders as "{{name}}",
+    like the old str.replace loop did.
+    """
+
+    def __missing__(self, key):
+        return "{{" + key + "}}"
+
+
+_NO_VALUES = _Values()
+
+
+# -----------------------------
+# Compiling
+# -----------------------------
+def compile_template(text):
+    """
+    "Hi {{name}} 👋" -> "Hi {name} 👋", a str.format template, so rendering
+    is one format_map call instead of one replace per argument. Literal
+    braces are escaped; a "{{" or "}}" that isn't a {{word}} placeholder is
+    rejected.
+    """
+    parts = PLACEHOLDER.split(text)
+    out = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            out.append("{" + part + "}")
+            continue
+        if "{{" in part or "}}" in part:
+            raise ValueError(f"malformed placeholder near {part.strip()[:30]!r}")
+        out.append(part.replace("{", "{{").replace("}", "}}"))
+    return "".join(out)
+
+
+def compile_catalog(data):
+    """
+    {key: [text, ...]} -> {key: (template, ...)}, validated:
+    every key a non-empty list of strings, a "fallback" key present, every
+    placeholder well formed.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("the catalog must be a JSON object")
+    if "fallback" not in data:
+        raise ValueError('missing the "fallback" key')
+
+    compiled = {}
+    for key, variants in data.items():
+        if not isinstance(variants, list) or not variants:
+            raise ValueError(f"{key}: expected a non-empty list of strings")
+        templates = []
+        for text in variants:
+            if not isinstance(text, str):
+                raise ValueError(f"{key}: expected a non-empty list of strings")
+            try:
+                templates.append(compile_template(text))
+            except ValueError as e:
+                raise ValueError(f"{key}: {e}") from None
+        compiled[key] = tuple(templates)
+    return compiled
+
+
+# -----------------------------
+# Catalog with hot reload
+# -----------------------------
+class ResponseCatalog:
+    """
+    clinic_responses.json compiled once into format templates.
+
+    Every `check_seconds` at most, a call stats the file; if it changed,
+    the new version is parsed and compiled, then swapped in with one
+    assignment, so other threads see either the old or the new catalog,
+    never a mix. An invalid file is reported once and the running catalog
+    is kept. Each worker process checks on its own: edits go live without
+    a restart.
+    """
+
+    def __init__(self, path, check_seconds=2.0):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._snapshot = None        # (stamp, raw dict, compiled dict)
+        self._failed_stamp = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _stamp(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self, stamp):
+        with open(self.path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return stamp, raw, compile_catalog(raw)
+
+    def _current(self):
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now < self._next_check:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and now < self._next_check:
+                return snapshot
+            self._next_check = now + self.check_seconds
+
+            try:
+                stamp = self._stamp()
+            except OSError as e:
+                if snapshot is None:
+                    raise
+                print(f"⚠️ Responses file unavailable, keeping the loaded one: {e}")
+                return snapshot
+
+            if snapshot is not None and (stamp == snapshot[0] or stamp == self._failed_stamp):
+                return snapshot
+
+            try:
+                new_snapshot = self._load(stamp)
+            except ValueError as e:   # includes JSON syntax errors
+                if snapshot is None:
+                    raise
+                self._failed_stamp = stamp
+                print(f"⚠️ {os.path.basename(self.path)} not reloaded: {e}")
+                return snapshot
+
+            if snapshot is not None:
+                print(f"🔄 Reloaded {os.path.basename(self.path)}")
+            self._snapshot = new_snapshot
+            self._failed_stamp = None
+            return new_snapshot
+
+    @property
+    def raw(self):
+        """
+        The parsed JSON ({key: [text, ...]}) of the current version.
+        """
+        return self._current()[1]
+
+    def render(self, key, values):
+        """
+        A random variant of `key` ("fallback" if unknown) with its
+        {{placeholders}} filled from the `values` dict.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() >= self._next_check:
+            snapshot = self._current()
+
+        compiled = snapshot[2]
+        variants = compiled.get(key) or compiled["fallback"]
+        template = variants[0] if len(variants) == 1 else random.choice(variants)
+        if not values:
+            return template.format_map(_NO_VALUES)
+        return template.format_map(_Values(values))
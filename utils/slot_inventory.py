@@ -0,0 +1,224 @@
+# utils/slot_inventory.py
+
+from datetime import date, time, timedelta
+
+from models import db, Slot, Appointment
+from utils.day_schedule import to_minutes
+from utils.events import appointment_changed
+from utils.slot_manager import BLOCKING_STATUSES, SLOT_INVENTORY
+
+slots = Slot.__table__
+
+
+# -----------------------------
+# Cells
+# -----------------------------
+def day_cells(windows, step_minutes):
+    """
+    (start, end) minute cells of a working day: the step grid of each
+    window, the last cell cut at the window end.
+    """
+    return [
+        (start, min(start + step_minutes, w_end))
+        for w_start, w_end in windows
+        for start in range(w_start, w_end, step_minutes)
+    ]
+
+
+def _as_time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+# -----------------------------
+# Materialization
+# -----------------------------
+def materialize_slots(slot_manager, start_date=None, days=28, doctor_ids=None, rebuild=False):
+    """
+    Bulk-inserts slot rows for the open days in [start_date, start_date +
+    days) (today if None), for every doctor or `doctor_ids`. Cells covered
+    by a pending/approved appointment are stored as taken by it.
+
+    (doctor, date) pairs that already have rows are skipped, so running it
+    daily just extends the horizon. `rebuild` first deletes the rows in the
+    range, e.g. after a doctor's hours or the calendar changed.
+
+    Returns the number of rows inserted.
+    """
+    start_date = start_date or date.today()
+    end_date = start_date + timedelta(days=days - 1)
+    dates = [start_date + timedelta(days=i) for i in range(days)]
+
+    hours = slot_manager.doctor_hours()
+    if doctor_ids is not None:
+        hours = {d: h for d, h in hours.items() if d in doctor_ids}
+    if not hours:
+        return 0
+
+    in_range = (
+        slots.c.doctor_id.in_(list(hours)),
+        slots.c.date.between(start_date, end_date)
+    )
+    if rebuild:
+        db.session.execute(slots.delete().where(*in_range))
+        done = set()
+    else:
+        done = set(db.session.execute(
+            db.select(slots.c.doctor_id, slots.c.date).where(*in_range).distinct()
+        ).all())
+
+    appointments = db.session.query(
+        Appointment.id,
+        Appointment.doctor_id,
+        Appointment.appointment_date,
+        Appointment.appointment_time,
+        Appointment.duration_minutes
+    ).filter(
+        Appointment.doctor_id.in_(list(hours)),
+        Appointment.appointment_date.between(start_date, end_date),
+        Appointment.status.in_(BLOCKING_STATUSES)
+    ).all()
+
+    booked = {}
+    for appt_id, doctor_id, appt_date, appt_time, duration in appointments:
+        start = to_minutes(appt_time)
+        booked.setdefault((doctor_id, appt_date), []).append(
+            (start, start + (duration or 30), appt_id)
+        )
+
+    rows = []
+    for doctor_id, doctor_hours in hours.items():
+        for day_date in dates:
+            if (doctor_id, day_date) in done or not slot_manager.is_open(day_date):
+                continue
+
+            day_booked = booked.get((doctor_id, day_date), [])
+            windows = slot_manager.day_windows(day_date, doctor_hours)
+
+            for cell_start, cell_end in day_cells(windows, doctor_hours.step_minutes):
+                owner = next(
+                    (appt_id for a_start, a_end, appt_id in day_booked
+                     if a_start < cell_end and a_end > cell_start),
+                    None
+                )
+                rows.append({
+                    "doctor_id": doctor_id,
+                    "date": day_date,
+                    "slot_time": _as_time(cell_start),
+                    "is_available": owner is None,
+                    "appointment_id": owner
+                })
+
+    if rows:
+        db.session.execute(slots.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+def load_taken_blocks(doctor_hours, keys):
+    """
+    {(doctor_id, date): [(start, end), ...]} of the taken cells, for the
+    (doctor_id, date) `keys` that are materialized. One range scan on the
+    (doctor_id, date, slot_time) index; keys without rows are left out so
+    the caller can fall back to the appointments table.
+    """
+    wanted = set(keys)
+    doctor_ids = sorted({doctor_id for doctor_id, _ in wanted})
+    dates = [day_date for _, day_date in wanted]
+
+    rows = db.session.execute(
+        db.select(slots.c.doctor_id, slots.c.date, slots.c.slot_time, slots.c.is_available)
+        .where(
+            slots.c.doctor_id.in_(doctor_ids),
+            slots.c.date.between(min(dates), max(dates))
+        )
+    ).all()
+
+    taken = {}
+    for doctor_id, day_date, slot_time, is_available in rows:
+        key = (doctor_id, day_date)
+        if key not in wanted:
+            continue
+        blocks = taken.setdefault(key, [])
+        if not is_available:
+            start = to_minutes(slot_time)
+            blocks.append((start, start + doctor_hours[doctor_id].step_minutes))
+    return taken
+
+
+# -----------------------------
+# Claim / release
+# -----------------------------
+def claim_slots(slot_manager, appointment):
+    """
+    Marks the cells covered by `appointment` (flushed, so it has an id) as
+    taken with a single conditional UPDATE: it only touches free cells, so
+    the booking wins iff every covered cell was updated. Run it inside
+    the booking transaction and roll back on False.
+
+    Returns True (claimed), False (a cell is taken, or the time is outside
+    the doctor's hours) or None (the day isn't materialized).
+    """
+    doctor_id = appointment.doctor_id
+    day_date = appointment.appointment_date
+    hours = slot_manager.doctor_hours(doctor_id)[doctor_id]
+    windows = slot_manager.day_windows(day_date, hours)
+
+    start = to_minutes(appointment.appointment_time)
+    end = start + (appointment.duration_minutes or 30)
+    cells = [
+        cell for cell in day_cells(windows, hours.step_minutes)
+        if cell[0] < end and cell[1] > start
+    ]
+    inside = any(w_start <= start and end <= w_end for w_start, w_end in windows)
+
+    if inside and cells:
+        result = db.session.execute(
+            slots.update()
+            .where(
+                slots.c.doctor_id == doctor_id,
+                slots.c.date == day_date,
+                slots.c.slot_time.between(_as_time(cells[0][0]), _as_time(cells[-1][0])),
+                slots.c.is_available.is_(True)
+            )
+            .values(is_available=False, appointment_id=appointment.id)
+        )
+        if result.rowcount == len(cells):
+            return True
+
+    materialized = db.session.execute(
+        db.select(slots.c.id).where(
+            slots.c.doctor_id == doctor_id,
+            slots.c.date == day_date
+        ).limit(1)
+    ).first()
+    return False if materialized else None
+
+
+def release_slots(appointment_id):
+    """
+    Frees the cells held by an appointment. Returns the number of cells.
+    """
+    result = db.session.execute(
+        slots.update()
+        .where(slots.c.appointment_id == appointment_id)
+        .values(is_available=True, appointment_id=None)
+    )
+    return result.rowcount
+
+
+@appointment_changed.connect
+def sync_slot_inventory(appointment, old_status=None):
+    """
+    Frees the appointment's cells once it stops blocking (rejected,
+    cancelled, completed). New bookings claim their cells inside
+    book_appointment's transaction, so there is nothing to do for them.
+    """
+    if not SLOT_INVENTORY or old_status is None:
+        return
+
+    if old_status in BLOCKING_STATUSES and appointment.status not in BLOCKING_STATUSES:
+        if release_slots(appointment.id):
+            db.session.commit()
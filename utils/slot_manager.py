@@ -1,16 +1,50 @@
 # utils/slot_manager.py
 
-from datetime import datetime, timedelta, time as dtime
+import heapq
+import os
+from datetime import datetime, timedelta
 from models import Appointment, db
+from utils.day_schedule import DaySchedule, candidate_grid, to_minutes, format_minutes
+from utils.availability_cache import availability_cache
+from utils.doctor_schedules import DoctorHours, load_doctor_hours
+from utils.clinic_calendar import clinic_calendar
+from utils.events import appointment_changed
+
+# statuses that occupy the doctor's timeline
+BLOCKING_STATUSES = ("pending", "approved")
+
+# "on": read availability from / claim bookings in the materialized slots
+# table (see utils/slot_inventory.py); days without slot rows fall back to
+# the appointments table
+SLOT_INVENTORY = os.getenv("SLOT_INVENTORY", "off").lower() == "on"
+
+
+@appointment_changed.connect
+def refresh_availability(appointment, old_status=None):
+    """
+    Runs after a new appointment (old_status=None) or a status change is
+    committed. Drops the cached day only if the change frees or takes time.
+    """
+    was_blocking = old_status in BLOCKING_STATUSES
+    is_blocking = appointment.status in BLOCKING_STATUSES
+
+    if was_blocking != is_blocking:
+        availability_cache.invalidate(
+            appointment.appointment_date, appointment.doctor_id
+        )
 
 
 class SlotManager:
     """
-    Timeline-based scheduler:
-    - doctor work: 09:00–13:00 and 14:00–18:00
-    - lunch break: 13:00–14:00
-    - base step: 15 minutes
-    - avoids overlaps using Appointment table
+    Timeline-based scheduler, one timeline per doctor:
+    - working hours, lunch and step come from the doctor's DoctorSchedule;
+      doctors without one use the clinic hours passed here
+      (default 09:00–13:00 and 14:00–18:00, 15-minute step)
+    - busy blocks are that doctor's pending/approved appointments only
+    - doctor_id=None means "any doctor": a start is offered when at least
+      one doctor can take it
+    - the clinic calendar (weekday templates, holidays) clips those hours;
+      closed days return nothing without querying appointments
     """
 
     def __init__(self,
@@ -18,80 +52,289 @@ class SlotManager:
                  lunch_start="13:00",
                  lunch_end="14:00",
                  end_time="18:00",
-                 step_minutes=15):
-        self.start_time_str = start_time
-        self.lunch_start_str = lunch_start
-        self.lunch_end_str = lunch_end
-        self.end_time_str = end_time
+                 step_minutes=15,
+                 cache=availability_cache,
+                 calendar=clinic_calendar,
+                 inventory=SLOT_INVENTORY):
+        self.clinic_hours = DoctorHours.parse(
+            start_time, lunch_start, lunch_end, end_time, step_minutes
+        )
         self.step_minutes = step_minutes
+        self.cache = cache
+        self.calendar = calendar
+        self.inventory = inventory
+
+        # Clinic working windows in minutes, parsed once
+        self.windows = self.clinic_hours.windows
 
     # -----------------------------
     # Internal helpers
     # -----------------------------
-    def _to_dt(self, date_str, time_str):
-        return datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+    def doctor_hours(self, doctor_id=None):
+        """
+        {doctor_id: DoctorHours} for `doctor_id`, or for every doctor when
+        it is None. The doctor list is one query, then cached.
+        """
+        hours = self.cache.get_doctors() if self.cache is not None else None
+        if hours is None or (doctor_id is not None and doctor_id not in hours):
+            # a miss on one id may be a doctor added since the list was cached
+            hours = load_doctor_hours(self.clinic_hours)
+            if self.cache is not None:
+                self.cache.set_doctors(hours)
+
+        if doctor_id is None:
+            return hours
+        if doctor_id not in hours:
+            raise ValueError(f"Unknown doctor: {doctor_id}")
+        return {doctor_id: hours[doctor_id]}
+
+    def offers_start(self, date_obj, time_obj, duration_minutes, doctor_id):
+        """
+        True if the doctor's schedule offers a `duration_minutes` block at
+        `time_obj` on `date_obj`: a start on their step grid, inside their
+        working hours, not crossing lunch, on a day the clinic is open.
+        Bookings are not looked at (the conflict check does that).
+        Raises ValueError if `doctor_id` isn't a doctor.
+        """
+        hours = self.doctor_hours(doctor_id)[doctor_id]
+        windows = self.day_windows(date_obj, hours)
+        grid = candidate_grid(windows, hours.step_minutes, duration_minutes)
+        return to_minutes(time_obj) in grid
+
+    def _busy_blocks(self, date_obj, doctor_ids):
+        """
+        {doctor_id: [(start, end), ...]} of the pending/approved appointments
+        on `date_obj`. Cached doctors are reused; the rest come from one
+        query on (doctor, date), so the cost follows the doctors asked for,
+        not the whole clinic's bookings.
+        """
+        by_key = self._busy_blocks_between([date_obj], doctor_ids)
+        return {doctor_id: blocks for (doctor_id, _), blocks in by_key.items()}
+
+    def _busy_blocks_between(self, dates, doctor_ids):
+        """
+        Same as `_busy_blocks` for every date in `dates`, as
+        {(doctor_id, date): blocks}. Cached entries are reused; the
+        remaining ones are loaded with a single query and cached (empty
+        days included). With the slot inventory on, materialized days are
+        read from the slots table first.
+        """
+        by_key = {}
+        missing = []
+        for doctor_id in doctor_ids:
+            for day_date in dates:
+                cached = self.cache.get_day(day_date, doctor_id) if self.cache is not None else None
+                if cached is None:
+                    missing.append((doctor_id, day_date))
+                else:
+                    by_key[(doctor_id, day_date)] = cached
+
+        if not missing:
+            return by_key
+
+        if self.inventory:
+            # materialized days: taken cells of the slots table
+            from utils.slot_inventory import load_taken_blocks
+
+            taken = load_taken_blocks(self.doctor_hours(), missing)
+            for key, blocks in taken.items():
+                if self.cache is not None:
+                    self.cache.set_day(key[1], blocks, key[0])
+                by_key[key] = blocks
+
+            missing = [key for key in missing if key not in taken]
+            if not missing:
+                return by_key
+
+        missing_doctors = sorted({doctor_id for doctor_id, _ in missing})
+        missing_dates = [day_date for _, day_date in missing]
+
+        rows = db.session.query(
+            Appointment.doctor_id,
+            Appointment.appointment_date,
+            Appointment.appointment_time,
+            Appointment.duration_minutes
+        ).filter(
+            Appointment.doctor_id.in_(missing_doctors),
+            Appointment.appointment_date.between(min(missing_dates), max(missing_dates)),
+            Appointment.status.in_(BLOCKING_STATUSES)
+        ).all()
+
+        loaded = {key: [] for key in missing}
+        for doctor_id, appt_date, appt_time, duration in rows:
+            key = (doctor_id, appt_date)
+            if key in loaded:
+                start = to_minutes(appt_time)
+                loaded[key].append((start, start + (duration or 30)))
+
+        for (doctor_id, day_date), blocks in loaded.items():
+            if self.cache is not None:
+                self.cache.set_day(day_date, blocks, doctor_id)
+            by_key[(doctor_id, day_date)] = blocks
 
-    def _parse_time(self, time_str):
-        return datetime.strptime(time_str, "%H:%M").time()
+        return by_key
+
+    def build_day(self, blocks, hours=None, day_date=None):
+        """
+        Day schedule for a doctor's working windows (clinic hours if
+        `hours` is None), clipped to the calendar on `day_date` if given,
+        with `blocks` marked busy.
+        """
+        hours = hours or self.clinic_hours
+        windows = hours.windows if day_date is None else self.day_windows(day_date, hours)
+        return DaySchedule(windows, hours.step_minutes).load(blocks)
+
+    def day_windows(self, day_date, hours):
+        """
+        The doctor's working windows on `day_date`, clipped to the calendar.
+        """
+        if self.calendar is None:
+            return hours.windows
+        return self.calendar.day_windows(day_date, hours.windows)
+
+    def is_open(self, day_date):
+        return self.calendar is None or self.calendar.is_open(day_date)
+
+    def _free_starts(self, days, duration_minutes):
+        """
+        Sorted, de-duplicated union of the free starts of several doctors'
+        day schedules. Each list is already sorted, so a k-way merge is
+        enough.
+        """
+        per_doctor = [day.free_starts(duration_minutes) for day in days]
+        if len(per_doctor) == 1:
+            return per_doctor[0]
+
+        merged = []
+        for minute in heapq.merge(*per_doctor):
+            if not merged or merged[-1] != minute:
+                merged.append(minute)
+        return merged
 
     # -----------------------------
     # Main: find available starts
     # -----------------------------
-    def get_available_start_times(self, date_str, duration_minutes):
+    def get_available_start_times(self, date_str, duration_minutes, doctor_id=None):
         """
         Returns list of start times (HH:MM) on a given date where a block of
-        `duration_minutes` can fit:
-        - inside working hours
-        - not crossing lunch
-        - not overlapping existing appointments (pending/approved)
+        `duration_minutes` can fit for the doctor (any doctor if None):
+        - inside that doctor's working hours
+        - not crossing their lunch
+        - not overlapping their appointments (pending/approved)
         """
         date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
 
-        day_start_dt = self._to_dt(date_str, self.start_time_str)
-        day_end_dt = self._to_dt(date_str, self.end_time_str)
+        hours = self.doctor_hours(doctor_id)
+        if not self.is_open(date_obj):
+            return []
 
-        lunch_start_dt = self._to_dt(date_str, self.lunch_start_str)
-        lunch_end_dt = self._to_dt(date_str, self.lunch_end_str)
+        busy = self._busy_blocks(date_obj, list(hours))
+        days = [self.build_day(busy[d], h, date_obj) for d, h in hours.items()]
 
-        # Load existing appointments for that date
-        existing = Appointment.query.filter_by(appointment_date=date_obj).filter(
-            Appointment.status.in_(["pending", "approved"])
-        ).all()
+        return [format_minutes(m) for m in self._free_starts(days, duration_minutes)]
 
-        existing_blocks = []
-        for appt in existing:
-            start_dt = datetime.combine(date_obj, appt.appointment_time)
-            end_dt = start_dt + timedelta(minutes=appt.duration_minutes or 30)
-            existing_blocks.append((start_dt, end_dt))
+    def doctors_free_at(self, date_obj, time_obj, duration_minutes):
+        """
+        Ids of the doctors who can take [time, time + duration) on
+        `date_obj`, least booked that day first, so "any doctor" bookings
+        spread across the clinic.
+        """
+        if not self.is_open(date_obj):
+            return []
 
-        available_starts = []
-        step = timedelta(minutes=self.step_minutes)
+        hours = self.doctor_hours()
+        busy = self._busy_blocks(date_obj, list(hours))
+        start = to_minutes(time_obj)
 
-        current = day_start_dt
-        while True:
-            end_candidate = current + timedelta(minutes=duration_minutes)
+        free = []
+        for doctor_id, doctor_hours in hours.items():
+            day = self.build_day(busy[doctor_id], doctor_hours, date_obj)
+            if day.is_free(start, duration_minutes):
+                booked = sum(end - begin for begin, end in day.busy)
+                free.append((booked, doctor_id))
 
-            # Stop if beyond day end
-            if end_candidate > day_end_dt:
-                break
+        return [doctor_id for _, doctor_id in sorted(free)]
 
-            # Skip if inside or crossing lunch
-            if current < lunch_end_dt and end_candidate > lunch_start_dt:
-                current = lunch_end_dt
+    # -----------------------------
+    # Range: many days x many durations
+    # -----------------------------
+    def get_availability_range(self, start_date_str, days, durations, doctor_id=None):
+        """
+        Returns {"YYYY-MM-DD": {duration: [HH:MM, ...]}} for `days`
+        consecutive dates starting at `start_date_str`, for every duration in
+        `durations`, for the doctor (any doctor if None). All appointments in
+        the range come from one query and each doctor's day schedule is
+        built once and reused for every duration. Closed days are listed
+        with no starts and never queried.
+        """
+        start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+        dates = [start_date + timedelta(days=i) for i in range(days)]
+        open_dates = {d for d in dates if self.is_open(d)}
+
+        hours = self.doctor_hours(doctor_id)
+        busy = self._busy_blocks_between(sorted(open_dates), list(hours)) if open_dates else {}
+        durations = sorted(set(durations))
+
+        availability = {}
+        for day_date in dates:
+            if day_date not in open_dates:
+                availability[day_date.strftime("%Y-%m-%d")] = {d: [] for d in durations}
                 continue
 
-            # Check overlap with existing appointments
-            conflict = False
-            for (s, e) in existing_blocks:
-                # overlap if NOT (end <= s or current >= e)
-                if not (end_candidate <= s or current >= e):
-                    conflict = True
-                    break
+            schedules = [
+                self.build_day(busy.get((d, day_date), []), h, day_date)
+                for d, h in hours.items()
+            ]
+
+            availability[day_date.strftime("%Y-%m-%d")] = {
+                d: [format_minutes(m) for m in self._free_starts(schedules, d)]
+                for d in durations
+            }
+
+        return availability
+
+    # -----------------------------
+    # Earliest openings
+    # -----------------------------
+    def find_next_available(self, duration_minutes, start_date=None, limit=5,
+                            max_days=14, doctor_id=None, now=None):
+        """
+        The first `limit` openings for `duration_minutes` from `start_date`
+        (today if None) onwards, as [{"date": "YYYY-MM-DD", "time": "HH:MM"}].
+        Appointments for the open days in the `max_days` horizon come from
+        one range query; days are then scanned in order and the scan stops
+        as soon as `limit` openings are found. Starts that already passed
+        today are skipped.
+        """
+        now = now or datetime.now()
+        start_date = start_date or now.date()
+        if start_date < now.date():
+            start_date = now.date()
+
+        dates = [start_date + timedelta(days=i) for i in range(max_days)]
+        open_dates = [d for d in dates if self.is_open(d)]
+        if not open_dates:
+            return []
+
+        hours = self.doctor_hours(doctor_id)
+        busy = self._busy_blocks_between(open_dates, list(hours))
+        cutoff = to_minutes(now.time())
 
-            if not conflict:
-                # valid starting time
-                available_starts.append(current.strftime("%H:%M"))
+        openings = []
+        for day_date in open_dates:
+            schedules = [
+                self.build_day(busy.get((d, day_date), []), h, day_date)
+                for d, h in hours.items()
+            ]
 
-            current += step
+            for minute in self._free_starts(schedules, duration_minutes):
+                if day_date == now.date() and minute <= cutoff:
+                    continue
+                openings.append({
+                    "date": day_date.strftime("%Y-%m-%d"),
+                    "time": format_minutes(minute)
+                })
+                if len(openings) >= limit:
+                    return openings
 
-        return available_starts
+        return openings
@@ -73,7 +73,11 @@ def validate_date(date_str: str) -> bool:
 # ----------------------------------------------------
 # Validate if slot exists & is available
 # ----------------------------------------------------
-from models import Slot, Appointment
+from sqlalchemy import or_
+
+from models import db, Slot, Appointment
+from utils.day_schedule import to_minutes
+from utils.slot_manager import BLOCKING_STATUSES
 
 def validate_slot(doctor_id, appt_date, appt_time):
     """
@@ -81,7 +85,9 @@ def validate_slot(doctor_id, appt_date, appt_time):
     - Does the slot exist?
     - Is it available?
     """
-    slot = Slot.query.filter_by(date=appt_date, slot_time=appt_time).first()
+    slot = Slot.query.filter_by(
+        doctor_id=doctor_id, date=appt_date, slot_time=appt_time
+    ).first()
 
     if not slot:
         return False, "Selected slot does not exist."
@@ -95,29 +101,52 @@ def validate_slot(doctor_id, appt_date, appt_time):
 # ----------------------------------------------------
 # Validate appointment conflicts (doctor + patient)
 # ----------------------------------------------------
-def validate_appointment_conflict(patient_id, doctor_id, appt_date, appt_time):
+def validate_appointment_conflict(patient_id, doctor_id, appt_date, appt_time,
+                                  duration_minutes=30):
     """
     Prevent:
     - patient double booking
     - doctor double booking
-    """
-
-    # Patient conflict
-    patient_conflict = Appointment.query.filter_by(
-        patient_id=patient_id,
-        appointment_date=appt_date,
-        appointment_time=appt_time
-    ).first()
-
-    if patient_conflict:
-        return False, "You already have an appointment at this time."
 
-    # Doctor conflict
-    doctor_conflict = Appointment.query.filter_by(
-        doctor_id=doctor_id,
-        appointment_date=appt_date,
-        appointment_time=appt_time
-    ).first()
+    Any pending/approved appointment of the patient or the doctor whose
+    [start, start + duration) overlaps the requested block is a conflict.
+    One query over the day (served by the patient/doctor date indexes).
+    Run it inside utils.booking.book_appointment to make check + insert
+    atomic. doctor_id=None checks the patient only (any-doctor booking,
+    before a doctor is chosen).
+    """
+    start = to_minutes(appt_time)
+    end = start + (duration_minutes or 30)
+
+    people = Appointment.patient_id == patient_id
+    if doctor_id is not None:
+        people = or_(people, Appointment.doctor_id == doctor_id)
+
+    rows = db.session.query(
+        Appointment.patient_id,
+        Appointment.doctor_id,
+        Appointment.appointment_time,
+        Appointment.duration_minutes
+    ).filter(
+        Appointment.appointment_date == appt_date,
+        Appointment.status.in_(BLOCKING_STATUSES),
+        people
+    ).all()
+
+    doctor_conflict = False
+    for other_patient, other_doctor, other_time, other_duration in rows:
+        other_start = to_minutes(other_time)
+        other_end = other_start + (other_duration or 30)
+
+        if other_end <= start or other_start >= end:
+            continue
+
+        # Patient conflict
+        if other_patient == patient_id:
+            return False, "You already have an appointment at this time."
+
+        # Doctor conflict
+        doctor_conflict = True
 
     if doctor_conflict:
         return False, "Doctor already has an appointment in this slot."